@@ -0,0 +1,176 @@
+import socket
+import threading
+
+# Limites do tamanho de bloco usado em send/recv de dados em massa
+TAMANHO_CHUNK_MIN = 64 * 1024
+TAMANHO_CHUNK_MAX = 4 * 1024 * 1024
+
+# Limites dos buffers SO_SNDBUF/SO_RCVBUF
+TAMANHO_BUFFER_MIN = 256 * 1024
+TAMANHO_BUFFER_MAX = 16 * 1024 * 1024
+
+# Estimativas iniciais para pares ainda não medidos (100 Mbit/s, 1 ms)
+VAZAO_PADRAO = 12.5e6
+RTT_PADRAO = 0.001
+
+# Tempo mínimo de dados que um bloco deve cobrir, para amortizar o custo das syscalls
+INTERVALO_CHUNK = 0.005
+
+# Peso das novas amostras na média móvel exponencial
+PESO_AMOSTRA = 0.3
+
+# Quantas vezes o buffer de envio uma transferência deve ter para que o emissor a use como amostra de vazão
+MULTIPLO_BUFFER_ENVIO = 4
+
+
+def configure_control_socket(sock: socket.socket):
+    """
+    Configura um socket de tráfego de controle (mensagens curtas), desativando o algoritmo de Nagle.
+
+    :param sock: Socket TCP conectado.
+    """
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, AttributeError):
+        pass
+
+
+def _limitar(valor, minimo, maximo):
+    return max(minimo, min(maximo, int(valor)))
+
+
+def _potencia_de_dois(valor):
+    return 1 << (int(valor).bit_length() - 1)
+
+
+class AjusteSocket:
+    """
+    Ajusta buffers de socket e tamanhos de bloco por dispositivo a partir do RTT e da vazão observados.
+
+    Os valores medidos ficam em cache por IP e são reutilizados nas próximas conexões com o mesmo dispositivo.
+    """
+
+    def __init__(self):
+        """
+        Inicializa o cache de parâmetros por dispositivo.
+        """
+        self._pares = {}
+        self._lock = threading.Lock()
+
+    def get_peer_params(self, ip):
+        """
+        Retorna os parâmetros atuais de um dispositivo.
+
+        :param ip: Endereço IP do dispositivo.
+        :return: Dicionário com 'rtt' (s), 'vazao' (bytes/s), 'chunk' e 'buffer' (bytes).
+        """
+        with self._lock:
+            medido = self._pares.get(ip, {})
+            par = {'rtt': medido.get('rtt', RTT_PADRAO), 'vazao': medido.get('vazao', VAZAO_PADRAO)}
+        par['chunk'] = self._chunk(par)
+        par['buffer'] = self._buffer(par)
+        return par
+
+    def record_rtt(self, ip, rtt):
+        """
+        Registra uma amostra de RTT (por exemplo, o tempo do handshake TCP).
+
+        :param ip: Endereço IP do dispositivo.
+        :param rtt: RTT medido, em segundos.
+        """
+        if rtt > 0:
+            self._atualizar(ip, 'rtt', rtt)
+
+    def record_throughput(self, ip, num_bytes, elapsed):
+        """
+        Registra a vazão observada em uma transferência.
+
+        :param ip: Endereço IP do dispositivo.
+        :param num_bytes: Quantidade de bytes transferidos.
+        :param elapsed: Duração da fase de dados, em segundos.
+        """
+        # Transferências muito pequenas medem latência, não vazão
+        if num_bytes >= TAMANHO_CHUNK_MIN and elapsed > 0:
+            self._atualizar(ip, 'vazao', num_bytes / elapsed)
+
+    def record_sent_throughput(self, ip, num_bytes, elapsed, send_buffer):
+        """
+        Registra a vazão observada pelo emissor de uma transferência.
+
+        sendall retorna assim que os dados são copiados para o buffer de envio do kernel, então até
+        send_buffer bytes ainda não saíram pela rede ao final do envio. Apenas os bytes que certamente já
+        saíram entram na amostra, e transferências menores que MULTIPLO_BUFFER_ENVIO buffers são
+        descartadas, pois mediriam apenas a cópia para o kernel.
+
+        :param ip: Endereço IP do dispositivo.
+        :param num_bytes: Quantidade de bytes enviados.
+        :param elapsed: Duração da fase de dados, em segundos.
+        :param send_buffer: Tamanho do buffer de envio do socket (SO_SNDBUF), em bytes.
+        """
+        if num_bytes >= MULTIPLO_BUFFER_ENVIO * send_buffer:
+            self.record_throughput(ip, num_bytes - send_buffer, elapsed)
+
+    def chunk_size(self, ip=None):
+        """
+        Retorna o tamanho de bloco recomendado para um dispositivo.
+
+        :param ip: Endereço IP do dispositivo, ou None para os valores padrão.
+        :return: Tamanho do bloco em bytes.
+        """
+        return self.get_peer_params(ip)['chunk']
+
+    def buffer_size(self, ip=None):
+        """
+        Retorna o tamanho de buffer de socket recomendado para um dispositivo.
+
+        :param ip: Endereço IP do dispositivo, ou None para os valores padrão.
+        :return: Tamanho do buffer em bytes.
+        """
+        return self.get_peer_params(ip)['buffer']
+
+    def has_measurements(self, ip):
+        """
+        Indica se a vazão de um dispositivo já foi medida.
+
+        :param ip: Endereço IP do dispositivo.
+        """
+        with self._lock:
+            return 'vazao' in self._pares.get(ip, {})
+
+    def configure_bulk_socket(self, sock: socket.socket, ip=None, keep_autotuning=True):
+        """
+        Configura um socket de dados em massa com buffers dimensionados pelo produto banda-atraso.
+
+        Definir SO_SNDBUF/SO_RCVBUF desativa o ajuste automático dos buffers TCP do sistema, então, por
+        padrão, os buffers só são definidos para dispositivos cuja vazão já foi medida.
+
+        :param sock: Socket conectado.
+        :param ip: Endereço IP do dispositivo, ou None para os valores padrão.
+        :param keep_autotuning: Se True, os buffers de dispositivos ainda não medidos (ou de ip None) são
+            mantidos. Use False para sockets UDP, que não têm ajuste automático.
+        """
+        if keep_autotuning and (ip is None or not self.has_measurements(ip)):
+            return
+        tamanho = self.buffer_size(ip)
+        for opcao in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, opcao, tamanho)
+            except OSError:
+                pass
+
+    def _atualizar(self, ip, chave, amostra):
+        with self._lock:
+            par = self._pares.setdefault(ip, {})
+            if chave in par:
+                par[chave] = (1 - PESO_AMOSTRA) * par[chave] + PESO_AMOSTRA * amostra
+            else:
+                par[chave] = amostra
+
+    def _chunk(self, par):
+        # O bloco cobre ao menos um RTT de dados e ao menos INTERVALO_CHUNK segundos de transmissão
+        tamanho = par['vazao'] * max(par['rtt'], INTERVALO_CHUNK)
+        return _potencia_de_dois(_limitar(tamanho, TAMANHO_CHUNK_MIN, TAMANHO_CHUNK_MAX))
+
+    def _buffer(self, par):
+        # Duas vezes o produto banda-atraso, para manter o enlace cheio durante a janela de ACKs
+        return _limitar(2 * par['vazao'] * par['rtt'], TAMANHO_BUFFER_MIN, TAMANHO_BUFFER_MAX)
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+TAMANHO_LEITURA = 1024 * 1024
+# Número de hashes de arquivos não indexados (por exemplo, arquivos enviados) mantidos em memória
+TAMANHO_CACHE_HASH = 1024
+
+CAMINHO_INDICE_PADRAO = os.path.join(os.path.expanduser('~'), '.arquivos_em_rede_local', 'indice_conteudo.jsonl')
+
+
+def sha256_file(file_path, chunk=TAMANHO_LEITURA):
+    """
+    Calcula o SHA-256 de um arquivo.
+
+    :param file_path: Caminho do arquivo.
+    :param chunk: Tamanho dos blocos de leitura.
+    :return: Hash em hexadecimal.
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        while True:
+            data = file.read(chunk)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+
+class IndiceConteudo:
+    """
+    Índice de arquivos recebidos endereçados pelo SHA-256 do conteúdo.
+
+    Apenas arquivos gravados pelo recebimento devem ser indexados com add(); os arquivos do próprio
+    usuário (por exemplo, os que ele envia) não entram no índice, para que nunca sejam reaproveitados
+    como origem de outro arquivo.
+
+    Cada entrada guarda o tamanho e o mtime do arquivo no momento da indexação; uma entrada cujo arquivo
+    mudou ou sumiu é descartada na consulta. Se um caminho de índice for informado, as alterações são
+    acrescentadas a um diário (uma linha JSON por alteração), que é compactado quando fica grande.
+    """
+
+    def __init__(self, index_path=None):
+        """
+        Inicializa o índice, carregando o diário existente.
+
+        :param index_path: Caminho do arquivo de diário, ou None para manter o índice apenas em memória.
+        """
+        self.index_path = index_path
+        self._por_caminho = {}
+        self._por_hash = {}
+        self._linhas_diario = 0
+        self._cache_hash = OrderedDict()
+        self._lock = threading.Lock()
+        if index_path is not None:
+            self._load()
+
+    def __len__(self):
+        return len(self._por_caminho)
+
+    def add(self, path, file_hash):
+        """
+        Registra um arquivo local com o hash informado.
+
+        :param path: Caminho do arquivo.
+        :param file_hash: SHA-256 do conteúdo, em hexadecimal.
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        entrada = {'path': path, 'sha256': file_hash, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        with self._lock:
+            self._put(entrada)
+            self._append(entrada)
+
+    def remove(self, path):
+        """
+        Remove um arquivo do índice.
+
+        :param path: Caminho do arquivo.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            if self._drop(path):
+                self._append({'path': path, 'removed': True})
+
+    def lookup(self, file_hash):
+        """
+        Procura um arquivo local com o conteúdo informado.
+
+        :param file_hash: SHA-256 do conteúdo, em hexadecimal.
+        :return: Caminho de um arquivo com esse conteúdo, ou None.
+        """
+        with self._lock:
+            caminhos = list(self._por_hash.get(file_hash, ()))
+        for path in caminhos:
+            if self._is_current(path):
+                return path
+            self.remove(path)
+        return None
+
+    def hash_file(self, path):
+        """
+        Retorna o SHA-256 de um arquivo, reaproveitando o índice se o arquivo não mudou desde a indexação.
+
+        O arquivo não é acrescentado ao índice; o hash de arquivos não indexados fica apenas em um cache
+        em memória, válido enquanto o tamanho e o mtime não mudarem.
+
+        :param path: Caminho do arquivo.
+        :return: Hash em hexadecimal.
+        """
+        path = os.path.abspath(path)
+        if self._is_current(path):
+            return self._por_caminho[path]['sha256']
+        st = os.stat(path)
+        chave = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cache = self._cache_hash.get(path)
+            if cache is not None and cache[0] == chave:
+                self._cache_hash.move_to_end(path)
+                return cache[1]
+        file_hash = sha256_file(path)
+        with self._lock:
+            self._cache_hash[path] = (chave, file_hash)
+            self._cache_hash.move_to_end(path)
+            while len(self._cache_hash) > TAMANHO_CACHE_HASH:
+                self._cache_hash.popitem(last=False)
+        return file_hash
+
+    def materialize(self, file_hash, destination):
+        """
+        Cria um arquivo no destino com o conteúdo de um arquivo já indexado.
+
+        O conteúdo é sempre copiado: um hard link faria os dois arquivos compartilharem o conteúdo, e
+        gravar um deles alteraria o outro. A cópia é feita em um arquivo temporário que substitui o destino
+        ao final, então um arquivo existente com o mesmo nome nunca é truncado.
+
+        :param file_hash: SHA-256 do conteúdo, em hexadecimal.
+        :param destination: Caminho do arquivo a ser criado.
+        :return: True se o arquivo foi criado, False se o conteúdo não está disponível localmente.
+        """
+        source = self.lookup(file_hash)
+        if source is None:
+            return False
+        destination = os.path.abspath(destination)
+        if source == destination:
+            return True
+        temporario = destination + '.part'
+        shutil.copyfile(source, temporario)
+        os.replace(temporario, destination)
+        self.add(destination, file_hash)
+        return True
+
+    def _is_current(self, path):
+        entrada = self._por_caminho.get(path)
+        if entrada is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return st.st_size == entrada['size'] and st.st_mtime_ns == entrada['mtime_ns']
+
+    def _put(self, entrada):
+        self._drop(entrada['path'])
+        self._por_caminho[entrada['path']] = entrada
+        self._por_hash.setdefault(entrada['sha256'], set()).add(entrada['path'])
+
+    def _drop(self, path):
+        entrada = self._por_caminho.pop(path, None)
+        if entrada is None:
+            return False
+        caminhos = self._por_hash.get(entrada['sha256'])
+        if caminhos is not None:
+            caminhos.discard(path)
+            if not caminhos:
+                del self._por_hash[entrada['sha256']]
+        return True
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entrada = json.loads(line)
+                    except ValueError:
+                        # Linha incompleta de uma gravação interrompida
+                        continue
+                    self._linhas_diario += 1
+                    if entrada.get('removed'):
+                        self._drop(entrada['path'])
+                    else:
+                        self._put(entrada)
+        except FileNotFoundError:
+            pass
+
+    def _append(self, entrada):
+        if self.index_path is None:
+            return
+        if self._linhas_diario > 2 * len(self._por_caminho) + 100:
+            self._compact()
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        with open(self.index_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entrada) + '\n')
+        self._linhas_diario += 1
+
+    def _compact(self):
+        temporario = self.index_path + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as file:
+            for entrada in self._por_caminho.values():
+                file.write(json.dumps(entrada) + '\n')
+        os.replace(temporario, self.index_path)
+        self._linhas_diario = len(self._por_caminho)
@@ -0,0 +1,232 @@
+import os
+import threading
+from time import monotonic
+
+TAMANHO_PAGINA_PADRAO = 100
+TAMANHO_PAGINA_MAX = 1000
+
+# Intervalo mínimo entre varreduras disparadas por listagens
+INTERVALO_VARREDURA = 30.0
+
+
+class Catalogo:
+    """
+    Catálogo das pastas compartilhadas por este dispositivo.
+
+    A varredura é incremental: cada arquivo é comparado pelo tamanho e mtime com a varredura anterior,
+    sem leitura de conteúdo. Ela roda em uma thread em segundo plano, disparada por share() e por
+    listagens com a varredura anterior vencida; as listagens são servidas da última varredura concluída,
+    já ordenada, sem esperar por uma nova.
+
+    Os arquivos são identificados por caminhos no formato "<pasta compartilhada>/<caminho relativo>",
+    sempre com '/' como separador.
+    """
+
+    def __init__(self, scan_interval=INTERVALO_VARREDURA):
+        """
+        Inicializa um catálogo vazio.
+
+        :param scan_interval: Idade máxima, em segundos, da última varredura antes que uma listagem dispare outra.
+        """
+        self.scan_interval = scan_interval
+        self.version = 0
+        self._pastas = {}
+        self._entradas = {}
+        self._cache = []
+        self._ultima_varredura = None
+        # _lock protege o estado publicado; _lock_varredura serializa as varreduras, que percorrem o disco sem _lock
+        self._lock = threading.Lock()
+        self._lock_varredura = threading.Lock()
+        self._ocioso = threading.Condition(self._lock)
+        self._varredura_thread = None
+        self._varredura_pedida = False
+
+    def share(self, path, name=None):
+        """
+        Publica uma pasta no catálogo.
+
+        A pasta é varrida em segundo plano; seus arquivos aparecem nas listagens quando a varredura termina.
+
+        :param path: Caminho da pasta.
+        :param name: Nome da pasta no catálogo. Padrão é o nome do diretório.
+        :return: Nome usado no catálogo.
+        """
+        path = os.path.abspath(path)
+        if not os.path.isdir(path):
+            raise NotADirectoryError(path)
+        name = name or os.path.basename(path.rstrip(os.sep)) or 'raiz'
+        if '/' in name:
+            raise ValueError("Shared folder name cannot contain '/'")
+        with self._lock:
+            self._pastas[name] = path
+        self._request_scan()
+        return name
+
+    def unshare(self, name):
+        """
+        Remove uma pasta do catálogo.
+
+        :param name: Nome da pasta no catálogo.
+        """
+        with self._lock:
+            if self._pastas.pop(name, None) is not None:
+                prefixo = name + '/'
+                self._entradas = {chave: entrada for chave, entrada in self._entradas.items()
+                                  if not chave.startswith(prefixo)}
+                self._publish()
+
+    def get_shared_folders(self):
+        """
+        Retorna as pastas compartilhadas.
+
+        :return: Dicionário nome -> caminho local.
+        """
+        with self._lock:
+            return dict(self._pastas)
+
+    def scan(self):
+        """
+        Varre as pastas compartilhadas, atualizando apenas os arquivos novos, alterados ou removidos.
+
+        Executa na thread que chama; o catálogo a chama em segundo plano. As listagens continuam servidas
+        da varredura anterior enquanto esta não termina.
+
+        :return: Número de alterações encontradas.
+        """
+        with self._lock_varredura:
+            with self._lock:
+                pastas = dict(self._pastas)
+                anteriores = self._entradas
+            entradas = {}
+            for name, raiz in pastas.items():
+                self._scan_folder(name, raiz, anteriores, entradas)
+            with self._lock:
+                # Descarta as pastas removidas ou trocadas durante a varredura
+                mantidas = {name for name, raiz in pastas.items() if self._pastas.get(name) == raiz}
+                if len(mantidas) < len(pastas):
+                    entradas = {chave: entrada for chave, entrada in entradas.items()
+                                if chave.split('/', 1)[0] in mantidas}
+                alteracoes = sum(1 for chave, entrada in entradas.items() if anteriores.get(chave) is not entrada)
+                alteracoes += sum(1 for chave in anteriores if chave not in entradas)
+                self._entradas = entradas
+                if alteracoes:
+                    self._publish()
+                self._ultima_varredura = monotonic()
+                return alteracoes
+
+    def wait_for_scan(self, timeout=None):
+        """
+        Aguarda o fim das varreduras em segundo plano.
+
+        :param timeout: Tempo máximo de espera, em segundos, ou None para esperar indefinidamente.
+        :return: True se não há varredura em andamento.
+        """
+        with self._ocioso:
+            return self._ocioso.wait_for(lambda: self._varredura_thread is None, timeout)
+
+    def list(self, page=0, page_size=TAMANHO_PAGINA_PADRAO):
+        """
+        Retorna uma página da listagem do catálogo, ordenada por caminho.
+
+        A listagem vem da última varredura concluída; se ela for mais antiga que scan_interval, uma nova
+        varredura é disparada em segundo plano.
+
+        :param page: Número da página, a partir de 0.
+        :param page_size: Quantidade de arquivos por página (no máximo TAMANHO_PAGINA_MAX).
+        :return: Dicionário com 'version', 'page', 'page_size', 'total' e 'entries', sendo cada entrada
+            um dicionário com 'path', 'size' e 'mtime'.
+        """
+        page_size = max(1, min(int(page_size), TAMANHO_PAGINA_MAX))
+        page = max(0, int(page))
+        with self._lock:
+            vencida = self._ultima_varredura is None or monotonic() - self._ultima_varredura > self.scan_interval
+            ocupado = self._varredura_thread is not None
+            entradas = self._cache[page * page_size:(page + 1) * page_size]
+            listing = {
+                'version': self.version,
+                'page': page,
+                'page_size': page_size,
+                'total': len(self._cache),
+                'entries': entradas,
+            }
+        if vencida and not ocupado:
+            self._request_scan()
+        return listing
+
+    def resolve(self, path):
+        """
+        Converte um caminho do catálogo no caminho local do arquivo.
+
+        :param path: Caminho no formato "<pasta compartilhada>/<caminho relativo>".
+        :return: Caminho local, ou None se o arquivo não estiver no catálogo ou se, desde a varredura,
+            tiver passado a apontar para fora da pasta compartilhada.
+        """
+        with self._lock:
+            if path not in self._entradas:
+                return None
+            name, relativo = path.split('/', 1)
+            raiz = self._pastas[name]
+        local = os.path.join(raiz, *relativo.split('/'))
+        # O arquivo (ou um diretório do caminho) pode ter sido trocado por um link simbólico após a varredura
+        raiz_real = os.path.realpath(raiz)
+        if os.path.islink(local) or os.path.commonpath([os.path.realpath(local), raiz_real]) != raiz_real:
+            return None
+        return local
+
+    def _publish(self):
+        # Chamado com _lock: ordena uma única vez, para que as listagens apenas fatiem
+        self.version += 1
+        self._cache = [self._entradas[chave] for chave in sorted(self._entradas)]
+
+    def _request_scan(self):
+        with self._lock:
+            self._varredura_pedida = True
+            if self._varredura_thread is not None:
+                return
+            self._varredura_thread = threading.Thread(target=self._run_scans, name='catalogo-varredura', daemon=True)
+            self._varredura_thread.start()
+
+    def _run_scans(self):
+        while True:
+            with self._lock:
+                if not self._varredura_pedida:
+                    self._varredura_thread = None
+                    self._ocioso.notify_all()
+                    return
+                self._varredura_pedida = False
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"Failed to scan shared folders: {e}")
+
+    def _scan_folder(self, name, raiz, anteriores, entradas):
+        pendentes = [raiz]
+        while pendentes:
+            diretorio = pendentes.pop()
+            try:
+                iterador = os.scandir(diretorio)
+            except OSError:
+                continue
+            with iterador:
+                for entrada in iterador:
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            pendentes.append(entrada.path)
+                            continue
+                        # Links simbólicos não são publicados: poderiam apontar para fora da pasta compartilhada
+                        if not entrada.is_file(follow_symlinks=False):
+                            continue
+                        st = entrada.stat()
+                    except OSError:
+                        continue
+                    relativo = os.path.relpath(entrada.path, raiz).replace(os.sep, '/')
+                    chave = f"{name}/{relativo}"
+                    anterior = anteriores.get(chave)
+                    if anterior is None or anterior['size'] != st.st_size or anterior['mtime_ns'] != st.st_mtime_ns:
+                        anterior = {
+                            'path': chave,
+                            'size': st.st_size,
+                            'mtime': st.st_mtime,
+                            'mtime_ns': st.st_mtime_ns,
+                        }
+                    entradas[chave] = anterior
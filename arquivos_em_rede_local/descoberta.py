@@ -1,5 +1,11 @@
 import socket
 import threading
+from time import perf_counter
+
+from arquivos_em_rede_local.ajuste import configure_control_socket
+from arquivos_em_rede_local.metricas import RegistroMetricas
+from arquivos_em_rede_local.rastreamento import Rastreador
+from arquivos_em_rede_local.transporte import TransporteSocket
 
 class Descoberta:
     """
@@ -13,11 +19,16 @@ class Descoberta:
         dispositivos (list): Lista de dispositivos conectados.
         running_discovery (bool): Flag para indicar se a descoberta está em execução.
         running_comunication (bool): Flag para indicar se a comunicação está em execução.
+        transporte (Transporte): Transporte usado para criar os sockets.
+        response_window (float): Tempo, em segundos, sem novas respostas até encerrar a escuta de respostas.
+        metricas (RegistroMetricas): Registro onde as métricas de descoberta são registradas.
+        rastreador (Rastreador): Rastreador do broadcast, dos handshakes e das verificações de dispositivos.
         discovery_listener_thread (threading.Thread): Thread para escutar mensagens de descoberta.
         comunication_thread (threading.Thread): Thread para iniciar a comunicação com dispositivos descobertos.
     """
 
-    def __init__(self, my_name, discovery_port=14810, comunication_port=7736):
+    def __init__(self, my_name, discovery_port=14810, comunication_port=7736, transporte=None, response_window=3,
+                 metricas=None, rastreador=None):
         """
         Inicializa a classe Descoberta.
 
@@ -25,18 +36,39 @@ class Descoberta:
             my_name (str): Nome do dispositivo.
             discovery_port (int, optional): Porta usada para descoberta de dispositivos. Padrão é 14810.
             comunication_port (int, optional): Porta usada para comunicação entre dispositivos. Padrão é 7736.
+            transporte (Transporte, optional): Transporte usado para criar os sockets. Padrão é TransporteSocket().
+            response_window (float, optional): Tempo sem novas respostas até encerrar a escuta de respostas. Padrão é 3.
+            metricas (RegistroMetricas, optional): Registro de métricas. Padrão é um novo RegistroMetricas().
+            rastreador (Rastreador, optional): Rastreador de spans. Padrão é um Rastreador() desativado.
         """
         self.my_name = my_name
         self.discovery_port = discovery_port
         self.comunication_port = comunication_port
-        self.local_ip = self.get_local_ip()
+        self.transporte = transporte if transporte is not None else TransporteSocket()
+        self.response_window = response_window
+        self.metricas = metricas if metricas is not None else RegistroMetricas()
+        self.rastreador = rastreador if rastreador is not None else Rastreador()
+        self._round_seconds = self.metricas.histogram('arquivos_discovery_round_seconds',
+                                                      'Tempo entre o início da escuta e a última resposta de descoberta')
+        self._responses = self.metricas.counter('arquivos_discovery_responses_total', 'Respostas de descoberta recebidas')
+        self._heartbeat_failures = self.metricas.counter('arquivos_discovery_heartbeat_failures_total',
+                                                         'Dispositivos removidos por não responderem à verificação')
+        self._errors = self.metricas.counter('arquivos_discovery_errors_total', 'Erros de comunicação na descoberta')
+        self.metricas.gauge('arquivos_discovery_peers', 'Dispositivos conectados',
+                            funcao=lambda: len(self.dispositivos))
+        # Obtido apenas no primeiro uso, pois a consulta ao transporte pode ser lenta
+        self._local_ip = None
         self.descobertas = []
         self.dispositivos = []
         self.running_discovery = False
         self.running_comunication = False
+        self._comunication_lock = threading.Lock()
+        # Os handshakes rodam em threads concorrentes; a verificação e a inclusão de um dispositivo são atômicas
+        self._dispositivos_lock = threading.Lock()
         self.discovery_listener_thread = threading.Thread(target=self.listen_for_discovery_messages, daemon=True)
         self.comunication_thread = threading.Thread(target=self.initiate_communication, daemon=True)
         self.listen_for_responses_thread = threading.Thread(target=self.listen_for_responses, daemon=True)
+        self.responses_listening = threading.Event()
         self.verify_devices_alive_thread = threading.Thread(target=self.verify_devices_alive, daemon=True)
 
     def __del__(self):
@@ -64,6 +96,22 @@ class Descoberta:
             self.running_comunication = False
             self.comunication_thread.join()
 
+    @property
+    def local_ip(self):
+        """
+        Endereço IP local do dispositivo, obtido no primeiro acesso.
+
+        Returns:
+            str: Endereço IP local.
+        """
+        if self._local_ip is None:
+            self._local_ip = self.get_local_ip()
+        return self._local_ip
+
+    @local_ip.setter
+    def local_ip(self, ip):
+        self._local_ip = ip
+
     def get_local_ip(self):
         """
         Obtém o endereço IP local do dispositivo.
@@ -71,44 +119,42 @@ class Descoberta:
         Returns:
             str: Endereço IP local.
         """
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        try:
-            # Não precisa se conectar de fato, apenas obter o IP local
-            s.connect(('10.254.254.254', 1))
-            ip = s.getsockname()[0]
-        except Exception:
-            ip = '127.0.0.1'
-        finally:
-            s.close()
-        return ip
+        return self.transporte.get_local_ip()
 
     def broadcast_discovery_message(self):
         """
         Envia uma mensagem de descoberta para a rede local.
         """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        for _ in range(3):
-            mensagem = b'Discovery: Who is out there?'
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            sock.sendto(mensagem, ('<broadcast>', self.discovery_port))
-        sock.close()
+        with self.rastreador.span('broadcast', 'descoberta'):
+            sock = self.transporte.udp_socket()
+            # Associa o socket ao endereço do transporte, que é a origem vista pelos outros dispositivos
+            sock.bind(('', 0))
+            for _ in range(3):
+                mensagem = b'Discovery: Who is out there?'
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                sock.sendto(mensagem, (self.transporte.broadcast_address(), self.discovery_port))
+            sock.close()
 
     def listen_for_discovery_messages(self):
         """
         Escuta mensagens de descoberta na rede local.
         """
         self.running_discovery = True
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.bind(('', self.discovery_port))
+        sock = self.transporte.discovery_socket(self.discovery_port)
         
         while self.running_discovery:
             sock.settimeout(1)
             try:
                 data, addr = sock.recvfrom(1024)
                 if data.decode() == 'Discovery: Who is out there?':
-                    self.descobertas.append(addr[0])
-                    if not self.running_comunication:
-                        self.comunication_thread.start()
+                    with self._comunication_lock:
+                        # Broadcasts repetidos do mesmo dispositivo geram um único handshake
+                        if addr[0] not in self.descobertas:
+                            self.descobertas.append(addr[0])
+                        if not self.running_comunication:
+                            self.running_comunication = True
+                            self.comunication_thread = threading.Thread(target=self.initiate_communication, daemon=True)
+                            self.comunication_thread.start()
             except socket.timeout:
                 continue
         sock.close()
@@ -124,6 +170,7 @@ class Descoberta:
         try:
             sock.sendall(mensagem)
         except Exception as e:
+            self._errors.inc()
             print(f"Erro ao enviar resposta: {e}")
 
     def receive_device_name(self, sock: socket.socket):
@@ -143,6 +190,7 @@ class Descoberta:
                 if message.startswith("My name is "):
                     return message[len("My name is "):]
         except Exception as e:
+            self._errors.inc()
             print(f"Erro ao receber nome: {e}")
             return None
         return None
@@ -158,6 +206,7 @@ class Descoberta:
         try:
             sock.sendall(mensagem.encode())
         except Exception as e:
+            self._errors.inc()
             print(f"Erro ao enviar nome: {e}")
 
     def initiate_communication(self):
@@ -165,28 +214,26 @@ class Descoberta:
         Inicia a comunicação com dispositivos descobertos.
         """
         self.running_comunication = True
-        for ip in self.descobertas:
+        while True:
+            # A lista é consumida sob o lock, pois o listener de descoberta acrescenta IPs concorrentemente
+            with self._comunication_lock:
+                if not self.descobertas:
+                    self.running_comunication = False
+                    break
+                ip = self.descobertas.pop(0)
             if ip != self.local_ip:
                 try:
-                    with socket.create_connection((ip, self.comunication_port)) as sock:
+                    with self.rastreador.span('handshake', 'descoberta', device=ip, role='initiator'), \
+                            self.transporte.create_connection((ip, self.comunication_port)) as sock:
+                        configure_control_socket(sock)
                         self.send_discovery_response(sock)
                         name = self.receive_device_name(sock)
                         if name:
                             self.send_device_name(sock)
-                            if not any(dispositivo['ip'] == ip for dispositivo in self.dispositivos):
-                                self.dispositivos.append({
-                                    'ip': ip,
-                                    'name': name
-                                })
-                            else:
-                                for dispositivo in self.dispositivos:
-                                    if dispositivo['ip'] == ip:
-                                        dispositivo['name'] = name
+                            self._add_device(ip, name)
                 except Exception as e:
+                    self._errors.inc()
                     print(f"Erro conectar com {ip}: {e}")
-            self.descobertas.remove(ip)
-        self.running_comunication = False
-        self.comunication_thread = threading.Thread(target=self.initiate_communication, daemon=True)
 
     def handle_discovery_response(self, ip, sock: socket.socket):
         """
@@ -196,46 +243,91 @@ class Descoberta:
             ip (str): Endereço IP do dispositivo.
             sock (socket.socket): Socket de comunicação.
         """
-        if not any(dispositivo['ip'] == ip for dispositivo in self.dispositivos):
-            self.send_device_name(sock)
-            name = self.receive_device_name(sock)
-            if name:
-                self.dispositivos.append({
-                    'ip': ip,
-                    'name': name
-                })
+        with self.rastreador.span('handshake', 'descoberta', device=ip, role='responder'):
+            if self.get_device_by_ip(ip) is None:
+                self.send_device_name(sock)
+                name = self.receive_device_name(sock)
+                if name:
+                    self._add_device(ip, name)
         sock.close()
 
+    def _add_device(self, ip, name):
+        """
+        Acrescenta um dispositivo à lista de dispositivos conectados, ou atualiza o nome se ele já estiver nela.
+
+        Args:
+            ip (str): Endereço IP do dispositivo.
+            name (str): Nome do dispositivo.
+        """
+        with self._dispositivos_lock:
+            for dispositivo in self.dispositivos:
+                if dispositivo['ip'] == ip:
+                    dispositivo['name'] = name
+                    return
+            self.dispositivos.append({
+                'ip': ip,
+                'name': name
+            })
+
+    def _remove_device(self, dispositivo):
+        """
+        Remove um dispositivo da lista de dispositivos conectados, se ele ainda estiver nela.
+
+        Args:
+            dispositivo (dict): Dispositivo a remover.
+        """
+        with self._dispositivos_lock:
+            if dispositivo in self.dispositivos:
+                self.dispositivos.remove(dispositivo)
+
     def listen_for_responses(self):
         """
         Escuta respostas de dispositivos na rede local.
         """
         threads = []
-        sock = socket.create_server(('', self.comunication_port))
-        sock.settimeout(3)
+        sock = self.transporte.create_server(('', self.comunication_port))
+        sock.settimeout(self.response_window)
+        self.responses_listening.set()
+        inicio = perf_counter()
+        ultima_resposta = None
         recived = True
         while recived:
             try:
                 conn, addr = sock.accept()
+                configure_control_socket(conn)
                 data = conn.recv(1024)
                 if data.decode() == 'I am here!':
+                    ultima_resposta = perf_counter()
+                    self._responses.inc()
                     t = threading.Thread(target=self.handle_discovery_response, args=(addr[0], conn,), daemon=True)
                     t.start()
                     threads.append(t)
             except socket.timeout:
                 recived = False
+        self.responses_listening.clear()
+        if ultima_resposta is not None:
+            self._round_seconds.observe(ultima_resposta - inicio)
         for t in threads:
             t.join()
         sock.close()
 
+    def _start_listen_for_responses(self):
+        """
+        Inicia a escuta de respostas e aguarda o servidor estar pronto, para que as respostas à mensagem
+        de descoberta não encontrem a porta fechada.
+        """
+        self.responses_listening.clear()
+        self.listen_for_responses_thread.start()
+        self.responses_listening.wait(self.response_window)
+
     def start_discovery_process(self):
         """
         Inicia o processo de descoberta de dispositivos na rede local.
         """
+        self._start_listen_for_responses()
         # Envia a mensagem de descoberta
         self.broadcast_discovery_message()
-        self.listen_for_responses_thread.start()
-        
+
         # Inicia a escuta de outras descobertas em uma thread separada
         self.discovery_listener_thread.start()
 
@@ -248,9 +340,9 @@ class Descoberta:
         if not self.running_discovery:
             self.start_discovery_process()
         elif not self.listen_for_responses_thread.is_alive():
-            self.broadcast_discovery_message()
             self.listen_for_responses_thread = threading.Thread(target=self.listen_for_responses, daemon=True)
-            self.listen_for_responses_thread.start()
+            self._start_listen_for_responses()
+            self.broadcast_discovery_message()
         
         if not self.verify_devices_alive_thread.is_alive():
             self.verify_devices_alive_thread = threading.Thread(target=self.verify_devices_alive, daemon=True)
@@ -272,15 +364,21 @@ class Descoberta:
         message = "Hello, are you there?"
         def send_message(dispositivo):
             try:
-                with socket.create_connection((dispositivo['ip'], self.comunication_port), timeout=5) as sock:
+                with self.rastreador.span('liveness', 'descoberta', device=dispositivo['ip']), \
+                        self.transporte.create_connection((dispositivo['ip'], self.comunication_port), timeout=5) as sock:
+                    configure_control_socket(sock)
                     sock.sendall(message.encode())
                     response = sock.recv(1024)
                     if not response:
-                        self.dispositivos.remove(dispositivo)
+                        self._heartbeat_failures.inc()
+                        self._remove_device(dispositivo)
             except Exception:
-                self.dispositivos.remove(dispositivo)
+                self._heartbeat_failures.inc()
+                self._remove_device(dispositivo)
         threads = []
-        for dispositivo in self.dispositivos:
+        with self._dispositivos_lock:
+            dispositivos = list(self.dispositivos)
+        for dispositivo in dispositivos:
             t = threading.Thread(target=send_message, args=(dispositivo,), daemon=True)
             t.start()
             threads.append(t)
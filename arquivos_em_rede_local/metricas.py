@@ -0,0 +1,290 @@
+import bisect
+import json
+import threading
+
+# Limites (em segundos) dos histogramas de duração
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+# Limites (em bytes/s) dos histogramas de vazão
+BUCKETS_VAZAO = (1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10)
+
+PORTA_METRICAS_PADRAO = 9464
+# Variável de ambiente com a porta do servidor de métricas da interface gráfica
+VARIAVEL_PORTA_METRICAS = 'ARQUIVOS_EM_REDE_LOCAL_METRICS_PORT'
+
+
+class _Fragmentado:
+    """
+    Base das métricas acumuladas em fragmentos por thread.
+
+    Cada thread escreve apenas no próprio fragmento, então as atualizações não usam lock; o lock só é
+    tomado na primeira atualização de cada thread e na leitura, que soma os fragmentos. Os fragmentos de
+    threads encerradas, que não podem mais ser alterados, são incorporados a um total base, para que
+    threads de curta duração não acumulem fragmentos.
+    """
+
+    def __init__(self, tamanho):
+        self._tamanho = tamanho
+        self._local = threading.local()
+        self._base = [0] * tamanho
+        self._fragmentos = []
+        self._lock = threading.Lock()
+
+    def _fragmento(self):
+        try:
+            return self._local.fragmento
+        except AttributeError:
+            fragmento = [0] * self._tamanho
+            with self._lock:
+                self._merge_finished()
+                self._fragmentos.append((threading.current_thread(), fragmento))
+            self._local.fragmento = fragmento
+            return fragmento
+
+    def _merge_finished(self):
+        """
+        Incorpora ao total base os fragmentos de threads encerradas. Deve ser chamado com o lock.
+        """
+        ativos = []
+        for thread, fragmento in self._fragmentos:
+            if thread.is_alive():
+                ativos.append((thread, fragmento))
+            else:
+                self._base = [a + b for a, b in zip(self._base, fragmento)]
+        self._fragmentos = ativos
+
+    def _soma(self):
+        with self._lock:
+            self._merge_finished()
+            fragmentos = [fragmento for _, fragmento in self._fragmentos]
+            base = list(self._base)
+        return [sum(valores) for valores in zip(base, *fragmentos)]
+
+
+class Contador(_Fragmentado):
+    """
+    Contador monotônico.
+    """
+
+    tipo = 'counter'
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, valor=1):
+        """
+        Incrementa o contador.
+
+        :param valor: Valor a somar.
+        """
+        self._fragmento()[0] += valor
+
+    @property
+    def value(self):
+        return self._soma()[0]
+
+
+class Histograma(_Fragmentado):
+    """
+    Histograma com limites fixos, no formato do Prometheus.
+    """
+
+    tipo = 'histogram'
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS):
+        """
+        :param buckets: Limites superiores dos buckets, em ordem crescente (o bucket +Inf é implícito).
+        """
+        self.buckets = tuple(buckets)
+        # Contagem de cada bucket, contagem total e soma
+        super().__init__(len(self.buckets) + 3)
+
+    def observe(self, valor):
+        """
+        Registra uma observação.
+
+        :param valor: Valor observado.
+        """
+        fragmento = self._fragmento()
+        fragmento[bisect.bisect_left(self.buckets, valor)] += 1
+        fragmento[-2] += 1
+        fragmento[-1] += valor
+
+    @property
+    def value(self):
+        """
+        Estado do histograma: dicionário com 'count', 'sum' e 'buckets' (limite -> contagem acumulada).
+        """
+        soma = self._soma()
+        acumulado = 0
+        buckets = {}
+        for limite, contagem in zip(self.buckets + (float('inf'),), soma[:-2]):
+            acumulado += contagem
+            buckets[limite] = acumulado
+        return {'count': soma[-2], 'sum': soma[-1], 'buckets': buckets}
+
+
+class Medidor:
+    """
+    Valor instantâneo, definido diretamente ou calculado por uma função no momento da leitura.
+    """
+
+    tipo = 'gauge'
+
+    def __init__(self, funcao=None):
+        """
+        :param funcao: Função sem argumentos que retorna o valor atual, ou None para usar set().
+        """
+        self.funcao = funcao
+        self._valor = 0
+
+    def set(self, valor):
+        self._valor = valor
+
+    @property
+    def value(self):
+        return self.funcao() if self.funcao is not None else self._valor
+
+
+class RegistroMetricas:
+    """
+    Conjunto de métricas da aplicação.
+
+    As métricas são identificadas pelo nome e por rótulos opcionais; pedir de novo uma métrica já
+    registrada retorna a mesma instância, então o registro pode ser compartilhado entre Descoberta e Transferencia.
+    """
+
+    def __init__(self):
+        self._metricas = {}
+        self._ajudas = {}
+        self._lock = threading.Lock()
+
+    def counter(self, nome, ajuda, labels=None):
+        """
+        Retorna o Contador com o nome e os rótulos informados, criando-o se necessário.
+        """
+        return self._get(nome, ajuda, labels, Contador)
+
+    def histogram(self, nome, ajuda, labels=None, buckets=BUCKETS_SEGUNDOS):
+        """
+        Retorna o Histograma com o nome e os rótulos informados, criando-o se necessário.
+        """
+        return self._get(nome, ajuda, labels, lambda: Histograma(buckets))
+
+    def gauge(self, nome, ajuda, labels=None, funcao=None):
+        """
+        Retorna o Medidor com o nome e os rótulos informados, criando-o se necessário. Se uma função for
+        informada, ela substitui a função do medidor existente.
+        """
+        medidor = self._get(nome, ajuda, labels, Medidor)
+        if funcao is not None:
+            medidor.funcao = funcao
+        return medidor
+
+    def snapshot(self):
+        """
+        Retorna os valores atuais de todas as métricas.
+
+        :return: Dicionário nome -> valor. Métricas com rótulos usam chaves no formato 'nome{rotulo=valor}'.
+        """
+        with self._lock:
+            itens = list(self._metricas.items())
+        resultado = {}
+        for (nome, labels), metrica in itens:
+            chave = nome + ('{' + ','.join(f'{k}={v}' for k, v in labels) + '}' if labels else '')
+            valor = metrica.value
+            if isinstance(metrica, Histograma):
+                valor['buckets'] = {('+Inf' if limite == float('inf') else limite): contagem
+                                    for limite, contagem in valor['buckets'].items()}
+            resultado[chave] = valor
+        return resultado
+
+    def render_prometheus(self):
+        """
+        Retorna as métricas no formato de texto do Prometheus.
+        """
+        with self._lock:
+            itens = sorted(self._metricas.items(), key=lambda item: item[0])
+        linhas = []
+        anterior = None
+        for (nome, labels), metrica in itens:
+            if nome != anterior:
+                linhas.append(f'# HELP {nome} {self._ajudas[nome]}')
+                linhas.append(f'# TYPE {nome} {metrica.tipo}')
+                anterior = nome
+            if isinstance(metrica, Histograma):
+                valor = metrica.value
+                for limite, contagem in valor['buckets'].items():
+                    le = '+Inf' if limite == float('inf') else repr(float(limite))
+                    linhas.append(f'{nome}_bucket{_format_labels(labels + (("le", le),))} {contagem}')
+                linhas.append(f'{nome}_sum{_format_labels(labels)} {float(valor["sum"])!r}')
+                linhas.append(f'{nome}_count{_format_labels(labels)} {valor["count"]}')
+            else:
+                linhas.append(f'{nome}{_format_labels(labels)} {metrica.value}')
+        return '\n'.join(linhas) + '\n'
+
+    def _get(self, nome, ajuda, labels, fabrica):
+        chave = (nome, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metrica = self._metricas.get(chave)
+            if metrica is None:
+                metrica = self._metricas[chave] = fabrica()
+                self._ajudas.setdefault(nome, ajuda)
+            return metrica
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+class ServidorMetricas:
+    """
+    Servidor HTTP local que expõe um RegistroMetricas em /metrics (formato Prometheus) e /stats (JSON).
+    """
+
+    def __init__(self, registro: RegistroMetricas, port=PORTA_METRICAS_PADRAO, host='127.0.0.1'):
+        """
+        Inicia o servidor em uma thread separada.
+
+        :param registro: Registro de métricas a expor.
+        :param port: Porta do servidor (0 escolhe uma porta livre).
+        :param host: Endereço do servidor. Padrão é o loopback.
+        """
+        # Importado aqui para não pesar na inicialização quando o servidor não é usado
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.registro = registro
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path == '/metrics':
+                    corpo = registro.render_prometheus().encode()
+                    tipo = 'text/plain; version=0.0.4; charset=utf-8'
+                elif handler.path == '/stats':
+                    corpo = json.dumps(registro.snapshot()).encode()
+                    tipo = 'application/json'
+                else:
+                    handler.send_error(404)
+                    return
+                handler.send_response(200)
+                handler.send_header('Content-Type', tipo)
+                handler.send_header('Content-Length', str(len(corpo)))
+                handler.end_headers()
+                handler.wfile.write(corpo)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """
+        Encerra o servidor.
+        """
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,208 @@
+import json
+import os
+import random
+import threading
+from collections import deque
+from time import perf_counter_ns
+
+# Número máximo de spans mantidos no buffer circular
+CAPACIDADE_PADRAO = 100000
+# Variáveis de ambiente que ativam o rastreamento na interface gráfica
+VARIAVEL_ARQUIVO_RASTREAMENTO = 'ARQUIVOS_EM_REDE_LOCAL_TRACE'
+VARIAVEL_AMOSTRAGEM = 'ARQUIVOS_EM_REDE_LOCAL_TRACE_SAMPLE'
+
+
+class _SpanNulo:
+    """
+    Span que não registra nada, retornado quando o rastreamento está desativado.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class _Span:
+    """
+    Intervalo de execução medido por um Rastreador.
+    """
+
+    __slots__ = ('_rastreador', '_nome', '_categoria', '_args', '_inicio', '_amostrado')
+
+    def __init__(self, rastreador, nome, categoria, args):
+        self._rastreador = rastreador
+        self._nome = nome
+        self._categoria = categoria
+        self._args = args
+
+    def set(self, **args):
+        """
+        Acrescenta argumentos ao span, por exemplo o número de bytes efetivamente lidos.
+        """
+        self._args.update(args)
+
+    def __enter__(self):
+        local = self._rastreador._thread_local()
+        if local.profundidade == 0:
+            # A amostragem é decidida no span mais externo de cada thread e vale para todos os spans internos
+            local.amostrado = self._rastreador._sample()
+        local.profundidade += 1
+        self._amostrado = local.amostrado
+        self._inicio = perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        fim = perf_counter_ns()
+        local = self._rastreador._local
+        local.profundidade -= 1
+        if self._amostrado:
+            if tipo is not None:
+                self._args['error'] = tipo.__name__
+            self._rastreador._record((self._nome, self._categoria, self._inicio, fim - self._inicio,
+                                      local.tid, local.nome_thread, self._args))
+        return False
+
+
+class Rastreador:
+    """
+    Rastreamento estruturado de trechos críticos em spans.
+
+    Os spans terminados vão para um buffer circular, que pode ser salvo em um arquivo no formato
+    Trace Event (JSON), aberto em visualizadores como chrome://tracing, Perfetto ou speedscope.
+
+    Desativado, span() retorna sempre o mesmo objeto vazio, sem medir tempo nem alocar memória.
+
+    Atributos:
+        enabled (bool): Indica se os spans são registrados.
+        sample_rate (float): Fração das operações registradas, entre 0 e 1. A decisão é tomada no span
+            mais externo de cada thread, então uma operação amostrada é registrada por inteiro.
+        hooks (list): Funções chamadas com cada span terminado, na forma de um evento do formato Trace Event.
+    """
+
+    def __init__(self, enabled=False, sample_rate=1.0, capacity=CAPACIDADE_PADRAO, seed=None):
+        """
+        Inicializa o rastreador.
+
+        :param enabled: Se True, os spans são registrados.
+        :param sample_rate: Fração das operações registradas, entre 0 e 1.
+        :param capacity: Número máximo de spans mantidos; os mais antigos são descartados.
+        :param seed: Semente do sorteio da amostragem.
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.hooks = []
+        self._spans = deque(maxlen=capacity)
+        self._random = random.Random(seed)
+        self._local = threading.local()
+        self._origem = perf_counter_ns()
+
+    def span(self, nome, categoria='', **args):
+        """
+        Retorna um gerenciador de contexto que mede o trecho executado dentro dele.
+
+        :param nome: Nome do span.
+        :param categoria: Categoria do span (por exemplo, 'transferencia' ou 'descoberta').
+        :param args: Argumentos registrados com o span.
+        """
+        if not self.enabled:
+            return _SPAN_NULO
+        return _Span(self, nome, categoria, args)
+
+    def add_hook(self, funcao):
+        """
+        Registra uma função chamada com cada span terminado.
+
+        :param funcao: Função que recebe o evento (dicionário no formato Trace Event).
+        """
+        self.hooks.append(funcao)
+
+    def events(self):
+        """
+        Retorna os spans do buffer no formato Trace Event.
+
+        :return: Lista de eventos.
+        """
+        pid = os.getpid()
+        spans = list(self._spans)
+        # Os nomes das threads vêm dos próprios spans, então só as threads ainda presentes no buffer aparecem
+        threads = {span[4]: span[5] for span in spans}
+        eventos = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': nome}}
+                   for tid, nome in threads.items()]
+        eventos.extend(self._to_event(span, pid) for span in spans)
+        return eventos
+
+    def dump(self, path):
+        """
+        Salva os spans do buffer em um arquivo no formato Trace Event.
+
+        :param path: Caminho do arquivo.
+        :return: Número de spans salvos.
+        """
+        eventos = self.events()
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, file)
+        return sum(1 for evento in eventos if evento['ph'] == 'X')
+
+    def clear(self):
+        """
+        Descarta os spans do buffer.
+        """
+        self._spans.clear()
+
+    def __len__(self):
+        return len(self._spans)
+
+    def _thread_local(self):
+        local = self._local
+        if not hasattr(local, 'profundidade'):
+            local.profundidade = 0
+            local.amostrado = False
+            local.tid = threading.get_ident()
+            local.nome_thread = threading.current_thread().name
+        return local
+
+    def _sample(self):
+        return self.sample_rate >= 1 or self._random.random() < self.sample_rate
+
+    def _record(self, span):
+        # deque.append com maxlen é atômico, então threads diferentes podem registrar sem lock
+        self._spans.append(span)
+        if self.hooks:
+            evento = self._to_event(span, os.getpid())
+            for hook in self.hooks:
+                hook(evento)
+
+    def _to_event(self, span, pid):
+        nome, categoria, inicio, duracao, tid, _, args = span
+        return {'name': nome, 'cat': categoria, 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': (inicio - self._origem) / 1000, 'dur': duracao / 1000, 'args': args}
+
+
+def from_environment():
+    """
+    Cria um Rastreador configurado pelas variáveis de ambiente.
+
+    O rastreamento é ativado quando ARQUIVOS_EM_REDE_LOCAL_TRACE contém o caminho do arquivo onde salvar
+    os spans; ARQUIVOS_EM_REDE_LOCAL_TRACE_SAMPLE define a fração das operações registradas. Um valor
+    inválido de amostragem não impede a inicialização da rede: é ignorado com um aviso, e todas as operações
+    são registradas.
+
+    :return: Tupla (rastreador, caminho do arquivo ou None).
+    """
+    caminho = os.environ.get(VARIAVEL_ARQUIVO_RASTREAMENTO)
+    try:
+        amostragem = float(os.environ.get(VARIAVEL_AMOSTRAGEM, '1'))
+    except ValueError:
+        print(f"Invalid {VARIAVEL_AMOSTRAGEM} value {os.environ[VARIAVEL_AMOSTRAGEM]!r}; using 1.0")
+        amostragem = 1.0
+    return Rastreador(enabled=bool(caminho), sample_rate=amostragem), caminho or None
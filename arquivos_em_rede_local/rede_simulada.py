@@ -0,0 +1,416 @@
+import errno
+import heapq
+import random
+import socket
+import threading
+from collections import deque
+from time import monotonic, sleep
+
+from arquivos_em_rede_local.transporte import Transporte
+
+PORTA_EFEMERA_INICIAL = 49152
+
+
+class RedeSimulada:
+    """
+    Rede simulada em memória, para executar muitas instâncias de Descoberta e Transferencia em um único processo.
+
+    Cada instância recebe um TransporteSimulado com um IP próprio, então todas podem usar as mesmas portas.
+    Cada sentido de cada par de IPs é um enlace com atraso fixo, banda limitada (com fila ilimitada) e,
+    para datagramas UDP, perda aleatória. Conexões TCP simuladas são confiáveis e preservam a ordem.
+
+    As perdas são sorteadas por um gerador derivado da semente, dos IPs do enlace e da posição do datagrama
+    no enlace, então dependem apenas da sequência de envios em cada enlace e não da ordem de execução das threads.
+
+    Atributos:
+        latency (float): Atraso de propagação em cada sentido, em segundos.
+        bandwidth (float): Banda de cada enlace em bytes/s, ou None para ilimitada.
+        loss (float): Probabilidade de perda de cada datagrama UDP.
+        seed (int): Semente das perdas.
+        datagrams_sent (int): Datagramas enviados (por destinatário).
+        datagrams_dropped (int): Datagramas descartados.
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, loss=0.0, seed=0):
+        """
+        Inicializa a rede simulada.
+
+        :param latency: Atraso de propagação em cada sentido, em segundos.
+        :param bandwidth: Banda de cada enlace em bytes/s, ou None para ilimitada.
+        :param loss: Probabilidade de perda de cada datagrama UDP.
+        :param seed: Semente das perdas.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.loss = loss
+        self.seed = seed
+        self.datagrams_sent = 0
+        self.datagrams_dropped = 0
+        self._lock = threading.Lock()
+        self._servidores = {}
+        self._udp = {}
+        self._udp_por_porta = {}
+        self._proxima_porta = {}
+        self._enlaces = {}
+        self._agenda = []
+        self._agenda_seq = 0
+        self._agenda_cond = threading.Condition()
+        self._agendador = None
+
+    def transport(self, ip):
+        """
+        Cria um transporte com o IP informado nesta rede.
+
+        :param ip: Endereço IP simulado.
+        :return: TransporteSimulado.
+        """
+        return TransporteSimulado(self, ip)
+
+    def _ephemeral_port(self, ip):
+        with self._lock:
+            porta = self._proxima_porta.get(ip, PORTA_EFEMERA_INICIAL)
+            while (ip, porta) in self._udp or (ip, porta) in self._servidores:
+                porta += 1
+            self._proxima_porta[ip] = porta + 1
+            return porta
+
+    def _deliver(self, origem, destino, tamanho, entrega, lossy=False):
+        """
+        Entrega uma mensagem de origem para destino, aplicando perda, banda e atraso do enlace.
+
+        :param entrega: Função chamada no momento da entrega.
+        :param lossy: Se True, a mensagem pode ser descartada (datagramas UDP).
+        """
+        with self._lock:
+            enlace = self._enlaces.setdefault((origem, destino), [0.0, 0])
+            if lossy:
+                enlace[1] += 1
+                self.datagrams_sent += 1
+                if self.loss and random.Random(f"{self.seed}:{origem}:{destino}:{enlace[1]}").random() < self.loss:
+                    self.datagrams_dropped += 1
+                    return
+            if not self.latency and not self.bandwidth:
+                instante = None
+            else:
+                inicio = max(monotonic(), enlace[0])
+                enlace[0] = inicio + (tamanho / self.bandwidth if self.bandwidth else 0.0)
+                instante = enlace[0] + self.latency
+        if instante is None:
+            entrega()
+            return
+        with self._agenda_cond:
+            heapq.heappush(self._agenda, (instante, self._agenda_seq, entrega))
+            self._agenda_seq += 1
+            if self._agendador is None:
+                self._agendador = threading.Thread(target=self._run_scheduler, daemon=True)
+                self._agendador.start()
+            self._agenda_cond.notify()
+
+    def _run_scheduler(self):
+        while True:
+            with self._agenda_cond:
+                while not self._agenda:
+                    self._agenda_cond.wait()
+                espera = self._agenda[0][0] - monotonic()
+                if espera > 0:
+                    self._agenda_cond.wait(espera)
+                    continue
+                _, _, entrega = heapq.heappop(self._agenda)
+            entrega()
+
+
+class TransporteSimulado(Transporte):
+    """
+    Transporte de um dispositivo em uma RedeSimulada.
+    """
+
+    # Os sockets simulados não têm descritor de arquivo
+    selectable = False
+
+    def __init__(self, rede: RedeSimulada, ip):
+        """
+        Inicializa o transporte.
+
+        :param rede: Rede simulada.
+        :param ip: Endereço IP simulado deste dispositivo.
+        """
+        self.rede = rede
+        self.ip = ip
+
+    def create_connection(self, address, timeout=None):
+        ip, port = address
+        with self.rede._lock:
+            servidor = self.rede._servidores.get((ip, port))
+        if servidor is None:
+            raise ConnectionRefusedError(errno.ECONNREFUSED, 'Connection refused')
+        local = (self.ip, self.rede._ephemeral_port(self.ip))
+        cliente = _SocketSimulado(self.rede, local, (ip, port))
+        remoto = _SocketSimulado(self.rede, (ip, port), local)
+        cliente._par, remoto._par = remoto, cliente
+        self.rede._deliver(self.ip, ip, 0, lambda: servidor._enqueue(remoto))
+        if self.rede.latency:
+            # Handshake: um RTT até a conexão ser estabelecida
+            sleep(2 * self.rede.latency)
+        cliente.settimeout(timeout)
+        return cliente
+
+    def create_server(self, address):
+        ip, port = address
+        endereco = (ip or self.ip, port or self.rede._ephemeral_port(self.ip))
+        servidor = _ServidorSimulado(self.rede, endereco)
+        with self.rede._lock:
+            if endereco in self.rede._servidores:
+                raise OSError(errno.EADDRINUSE, 'Address already in use')
+            self.rede._servidores[endereco] = servidor
+        return servidor
+
+    def udp_socket(self):
+        return _SocketUDPSimulado(self.rede, self.ip)
+
+    def get_local_ip(self):
+        return self.ip
+
+
+class _Aguardavel:
+    """
+    Base dos sockets simulados: timeout, fechamento e uso com "with".
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._timeout = None
+        self._fechado = False
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def gettimeout(self):
+        return self._timeout
+
+    def setblocking(self, flag):
+        self._timeout = None if flag else 0.0
+
+    def setsockopt(self, *args):
+        pass
+
+    def getsockopt(self, *args):
+        return 0
+
+    def _wait(self, pronto):
+        """
+        Espera até que pronto() seja verdadeiro, respeitando o timeout.
+        """
+        if not self._cond.wait_for(lambda: pronto() or self._fechado, self._timeout):
+            if self._timeout == 0.0:
+                raise BlockingIOError(errno.EAGAIN, 'Resource temporarily unavailable')
+            raise socket.timeout('timed out')
+        if self._fechado:
+            raise OSError(errno.EBADF, 'Bad file descriptor')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _SocketSimulado(_Aguardavel):
+    """
+    Uma ponta de uma conexão TCP simulada.
+    """
+
+    def __init__(self, rede, local, remoto):
+        super().__init__()
+        self._rede = rede
+        self._local = local
+        self._remoto = remoto
+        self._par = None
+        self._buffer = bytearray()
+        self._eof = False
+        self._escrita_encerrada = False
+
+    def getsockname(self):
+        return self._local
+
+    def getpeername(self):
+        return self._remoto
+
+    def sendall(self, data):
+        if self._fechado:
+            raise OSError(errno.EBADF, 'Bad file descriptor')
+        if self._escrita_encerrada:
+            raise BrokenPipeError(errno.EPIPE, 'Broken pipe')
+        par = self._par
+        if par._fechado:
+            raise ConnectionResetError(errno.ECONNRESET, 'Connection reset by peer')
+        data = bytes(data)
+        if data:
+            self._rede._deliver(self._local[0], self._remoto[0], len(data), lambda: par._push(data))
+
+    def send(self, data):
+        self.sendall(data)
+        return len(data)
+
+    def sendfile(self, file, offset=0, count=None):
+        file.seek(offset)
+        total = 0
+        while count is None or total < count:
+            data = file.read(65536 if count is None else min(65536, count - total))
+            if not data:
+                break
+            self.sendall(data)
+            total += len(data)
+        return total
+
+    def recv(self, n):
+        with self._cond:
+            self._wait(lambda: self._buffer or self._eof)
+            data = bytes(self._buffer[:n])
+            del self._buffer[:n]
+            return data
+
+    def recv_into(self, buffer, nbytes=0):
+        data = self.recv(nbytes or len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def shutdown(self, how):
+        if how in (socket.SHUT_WR, socket.SHUT_RDWR):
+            with self._cond:
+                if self._escrita_encerrada:
+                    return
+                self._escrita_encerrada = True
+            self._rede._deliver(self._local[0], self._remoto[0], 0, self._par._push_eof)
+
+    def close(self):
+        with self._cond:
+            if self._fechado:
+                return
+            self._fechado = True
+            self._cond.notify_all()
+        par = self._par
+        if par is not None and not self._escrita_encerrada:
+            self._rede._deliver(self._local[0], self._remoto[0], 0, par._push_eof)
+
+    def _push(self, data):
+        with self._cond:
+            if not self._fechado:
+                self._buffer += data
+                self._cond.notify_all()
+
+    def _push_eof(self):
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+
+class _ServidorSimulado(_Aguardavel):
+    """
+    Um socket TCP simulado em escuta.
+    """
+
+    def __init__(self, rede, endereco):
+        super().__init__()
+        self._rede = rede
+        self._endereco = endereco
+        self._pendentes = deque()
+
+    def getsockname(self):
+        return self._endereco
+
+    def accept(self):
+        with self._cond:
+            self._wait(lambda: self._pendentes)
+            conn = self._pendentes.popleft()
+        return conn, conn._remoto
+
+    def close(self):
+        with self._cond:
+            if self._fechado:
+                return
+            self._fechado = True
+            self._cond.notify_all()
+            pendentes = list(self._pendentes)
+            self._pendentes.clear()
+        with self._rede._lock:
+            if self._rede._servidores.get(self._endereco) is self:
+                del self._rede._servidores[self._endereco]
+        for conn in pendentes:
+            conn.close()
+
+    def _enqueue(self, conn):
+        with self._cond:
+            if not self._fechado:
+                self._pendentes.append(conn)
+                self._cond.notify_all()
+                return
+        conn.close()
+
+
+class _SocketUDPSimulado(_Aguardavel):
+    """
+    Um socket UDP simulado. Envios para '<broadcast>' ou para um endereço terminado em .255 chegam a todos
+    os sockets associados à porta de destino, inclusive ao do próprio remetente.
+    """
+
+    def __init__(self, rede, ip):
+        super().__init__()
+        self._rede = rede
+        self._ip = ip
+        self._endereco = None
+        self._fila = deque()
+
+    def getsockname(self):
+        return self._endereco or ('0.0.0.0', 0)
+
+    def bind(self, address):
+        ip, port = address
+        endereco = (ip or self._ip, port or self._rede._ephemeral_port(self._ip))
+        with self._rede._lock:
+            if endereco in self._rede._udp:
+                raise OSError(errno.EADDRINUSE, 'Address already in use')
+            self._rede._udp[endereco] = self
+            self._rede._udp_por_porta.setdefault(endereco[1], set()).add(self)
+        self._endereco = endereco
+
+    def sendto(self, data, address):
+        if self._endereco is None:
+            self.bind(('', 0))
+        host, port = address
+        data = bytes(data)
+        with self._rede._lock:
+            if host == '<broadcast>' or host.endswith('.255'):
+                alvos = sorted(self._rede._udp_por_porta.get(port, ()), key=lambda s: s._endereco)
+            else:
+                alvos = [self._rede._udp[(host, port)]] if (host, port) in self._rede._udp else []
+        origem = self._endereco
+        for alvo in alvos:
+            self._rede._deliver(self._ip, alvo._ip, len(data), lambda alvo=alvo: alvo._push(data, origem), lossy=True)
+        return len(data)
+
+    def recvfrom(self, n):
+        with self._cond:
+            self._wait(lambda: self._fila)
+            data, origem = self._fila.popleft()
+            return data[:n], origem
+
+    def recv(self, n):
+        return self.recvfrom(n)[0]
+
+    def close(self):
+        with self._cond:
+            if self._fechado:
+                return
+            self._fechado = True
+            self._cond.notify_all()
+        if self._endereco is not None:
+            with self._rede._lock:
+                if self._rede._udp.get(self._endereco) is self:
+                    del self._rede._udp[self._endereco]
+                    self._rede._udp_por_porta[self._endereco[1]].discard(self)
+
+    def _push(self, data, origem):
+        with self._cond:
+            if not self._fechado:
+                self._fila.append((data, origem))
+                self._cond.notify_all()
@@ -1,24 +1,73 @@
+import hashlib
+import json
+import os
 import socket
 import threading
-from time import sleep
+from time import perf_counter
+
+from arquivos_em_rede_local.ajuste import AjusteSocket, configure_control_socket
+from arquivos_em_rede_local.armazenamento import IndiceConteudo, sha256_file
+from arquivos_em_rede_local.catalogo import TAMANHO_PAGINA_PADRAO
+from arquivos_em_rede_local.metricas import RegistroMetricas, BUCKETS_VAZAO
+from arquivos_em_rede_local.rastreamento import Rastreador
+from arquivos_em_rede_local.transferencia_udp import EmissorUDP, ReceptorUDP, TAMANHO_MAX_UDP
+from arquivos_em_rede_local.transporte import TransporteSocket
+
+MARCADOR_FIM = b'End of file'
+
+MODO_TCP = 'tcp'
+MODO_UDP = 'udp'
+
+# Fases de um envio medidas em arquivos_transfer_phase_seconds. 'finish' vai do fim dos dados até o
+# receptor confirmar o recebimento: o fechamento da conexão no TCP, a resposta à verificação de integridade no UDP
+FASES_ENVIO = ('connect', 'authorization', 'data', 'finish')
+# Resultados contados em arquivos_transfers_total
+RESULTADOS = ('sent', 'received', 'denied', 'already_present', 'failed')
 
 class Transferencia:
     """
     Classe para gerenciar a transferência de arquivos entre dispositivos em uma rede local.
     """
 
-    def __init__(self, get_user_authorization, transfer_port=23009):
+    def __init__(self, get_user_authorization, transfer_port=23009, ajuste=None, download_dir='.', indice=None,
+                 catalogo=None, transporte=None, metricas=None, rastreador=None, listen=True):
         """
         Inicializa a classe Transferencia.
 
         :param get_user_authorization: Função para obter autorização do usuário para receber arquivos.
         :param transfer_port: Porta utilizada para a transferência de arquivos.
+        :param ajuste: AjusteSocket com os parâmetros de socket por dispositivo. Se None, um novo é criado.
+        :param download_dir: Diretório onde os arquivos recebidos são salvos.
+        :param indice: IndiceConteudo com os arquivos já recebidos. Se None, um índice em memória é criado.
+        :param catalogo: Catalogo com as pastas compartilhadas com outros dispositivos, ou None para não compartilhar.
+        :param transporte: Transporte usado para criar os sockets. Se None, usa TransporteSocket().
+        :param metricas: RegistroMetricas onde as métricas de transferência são registradas. Se None, um novo é criado.
+        :param rastreador: Rastreador dos trechos críticos (leitura, envio, recebimento, escrita e autorização).
+            Se None, um rastreador desativado é criado.
+        :param listen: Se True, o listener de solicitações é iniciado imediatamente; caso contrário, apenas
+            ao chamar start_listener().
         """
         self.transfer_port = transfer_port
-        self.running_listener = True
+        self.ajuste = ajuste if ajuste is not None else AjusteSocket()
+        self.download_dir = download_dir
+        self.indice = indice if indice is not None else IndiceConteudo()
+        self.catalogo = catalogo
+        self.transporte = transporte if transporte is not None else TransporteSocket()
+        self.metricas = metricas if metricas is not None else RegistroMetricas()
+        self.rastreador = rastreador if rastreador is not None else Rastreador()
+        self._bytes_sent = self.metricas.counter('arquivos_transfer_bytes_sent_total', 'Bytes de arquivos enviados')
+        self._bytes_received = self.metricas.counter('arquivos_transfer_bytes_received_total', 'Bytes de arquivos recebidos')
+        self._throughput = self.metricas.histogram('arquivos_transfer_throughput_bytes_per_second',
+                                                   'Vazão da fase de dados de cada transferência', buckets=BUCKETS_VAZAO)
+        self._phases = {fase: self.metricas.histogram('arquivos_transfer_phase_seconds', 'Duração de cada fase do envio',
+                                                      labels={'phase': fase}) for fase in FASES_ENVIO}
+        self._results = {resultado: self.metricas.counter('arquivos_transfers_total', 'Transferências por resultado',
+                                                          labels={'result': resultado}) for resultado in RESULTADOS}
+        self.running_listener = False
         self.listen_to_incoming_requests_thread = threading.Thread(target=self._listen_to_incoming_requests, daemon=True)
-        self.listen_to_incoming_requests_thread.start()
         self.get_user_authorization = get_user_authorization
+        if listen:
+            self.start_listener()
 
     def __del__(self):
         """
@@ -28,89 +77,548 @@ class Transferencia:
         if self.listen_to_incoming_requests_thread.is_alive():
             self.listen_to_incoming_requests_thread.join()
 
-    def send(self, file_path, device_ip):
+    def start_listener(self):
+        """
+        Inicia o listener de solicitações de outros dispositivos, se ainda não estiver em execução.
+        """
+        if not self.listen_to_incoming_requests_thread.is_alive():
+            self.running_listener = True
+            self.listen_to_incoming_requests_thread = threading.Thread(target=self._listen_to_incoming_requests,
+                                                                       daemon=True)
+            self.listen_to_incoming_requests_thread.start()
+
+    def send(self, file_path, device_ip, mode=MODO_TCP):
         """
         Envia um arquivo para um dispositivo especificado.
 
         :param file_path: Caminho do arquivo a ser enviado.
         :param device_ip: Endereço IP do dispositivo de destino.
-        :return: Mensagem indicando o sucesso ou falha da operação.
+        :param mode: MODO_TCP para enviar os dados pela conexão TCP, ou MODO_UDP para enviá-los por UDP,
+            usando a conexão TCP apenas para o handshake e a verificação de integridade.
+        :return: Mensagem indicando o sucesso ou falha da operação. Se o destino já tiver um arquivo
+            com o mesmo conteúdo, nenhum dado é transferido.
         """
+        if mode not in (MODO_TCP, MODO_UDP):
+            return "Failed to send file: Unknown mode " + str(mode)
+        if mode == MODO_UDP and not self.transporte.selectable:
+            return "Failed to send file: UDP mode not supported by transport"
+
         try:
-            with open(file_path, 'rb') as file:
-                data = file.read()
+            file = open(file_path, 'rb')
+            options = {}
+            if mode == MODO_UDP:
+                options = {'mode': MODO_UDP, 'size': os.path.getsize(file_path)}
         except Exception as e:
             return "Failed to get file: " + str(e)
+        if options.get('size', 0) > TAMANHO_MAX_UDP:
+            file.close()
+            return "Failed to send file: File too large for UDP mode"
 
-        with socket.create_connection((device_ip, self.transfer_port)) as sock:
-            if self._request_send_authorization(sock, file_path):
-                sock.sendall(data)
-                sock.sendall(b'End of file')
+        with file, self.rastreador.span('send_file', 'transferencia', file=os.path.basename(file_path),
+                                        device=device_ip, mode=mode):
+            try:
+                with self.rastreador.span('hash', 'transferencia'):
+                    options['sha256'] = self.indice.hash_file(file_path)
+            except OSError:
+                # Sem o hash, o destino apenas não pode reaproveitar uma cópia local
+                pass
+
+            inicio = perf_counter()
+            with self.transporte.create_connection((device_ip, self.transfer_port)) as sock:
+                conectado = perf_counter()
+                self._phases['connect'].observe(conectado - inicio)
+                # O tempo do handshake TCP é uma amostra de RTT
+                self.ajuste.record_rtt(device_ip, conectado - inicio)
+                self.ajuste.configure_bulk_socket(sock, device_ip)
+                with self.rastreador.span('authorization', 'transferencia'):
+                    response = self._request_send_authorization(sock, file_path, options)
+                autorizado = perf_counter()
+                self._phases['authorization'].observe(autorizado - conectado)
+                if response is None:
+                    self._results['denied'].inc()
+                    return "Failed to send file: Authorization denied"
+                if response[0] == "HAVE":
+                    self._results['already_present'].inc()
+                    return "File already present on device"
+                if mode == MODO_UDP:
+                    if len(response) < 2 or not response[1].isdigit():
+                        self._results['failed'].inc()
+                        return "Failed to send file: Receiver did not provide a UDP port"
+                    return self._send_file_udp(sock, file, device_ip, int(response[1]), options['size'])
+                self._send_file_data(sock, file, device_ip)
+                enviado = perf_counter()
+                self._phases['data'].observe(enviado - autorizado)
+                sock.sendall(MARCADOR_FIM)
+                self._wait_for_receiver_close(sock)
+                self._phases['finish'].observe(perf_counter() - enviado)
+                self._results['sent'].inc()
                 return "File sent successfully"
-            else:
-                return "Failed to send file: Authorization denied"
 
-    def _request_send_authorization(self, sock: socket.socket, file_path):
+    def browse(self, device_ip, page=0, page_size=TAMANHO_PAGINA_PADRAO):
+        """
+        Lista uma página do catálogo de arquivos compartilhados por um dispositivo.
+
+        :param device_ip: Endereço IP do dispositivo.
+        :param page: Número da página, a partir de 0.
+        :param page_size: Quantidade de arquivos por página.
+        :return: Página do catálogo (veja Catalogo.list), ou None se o dispositivo não compartilha arquivos.
+        """
+        with self.transporte.create_connection((device_ip, self.transfer_port)) as sock:
+            configure_control_socket(sock)
+            sock.settimeout(60)
+            sock.sendall(f"LIST {page} {page_size}".encode())
+            fields, data = self._recv_response_header(sock)
+            if fields is None:
+                return None
+            size = int(fields[1])
+            parts = [data]
+            while size > len(data):
+                chunk = sock.recv(size - len(data))
+                if not chunk:
+                    return None
+                parts.append(chunk)
+                size -= len(chunk)
+            return json.loads(b''.join(parts))
+
+    def pull(self, device_ip, path, offset=0, length=None):
+        """
+        Baixa um arquivo, ou um intervalo de bytes dele, do catálogo de outro dispositivo.
+
+        O arquivo é salvo em download_dir com o mesmo nome. O arquivo completo é recebido em um arquivo
+        temporário que substitui o destino ao final; um intervalo é gravado na mesma posição do arquivo
+        local, sem truncá-lo, o que permite retomar downloads interrompidos.
+
+        :param device_ip: Endereço IP do dispositivo.
+        :param path: Caminho do arquivo no catálogo remoto.
+        :param offset: Posição inicial, em bytes.
+        :param length: Quantidade de bytes, ou None para ler até o fim do arquivo.
+        :return: Mensagem indicando o sucesso ou falha da operação.
+        """
+        destination = os.path.join(self.download_dir, os.path.basename(path))
+        inicio = perf_counter()
+        with self.transporte.create_connection((device_ip, self.transfer_port)) as sock:
+            self.ajuste.record_rtt(device_ip, perf_counter() - inicio)
+            self.ajuste.configure_bulk_socket(sock, device_ip)
+            sock.settimeout(60)
+            sock.sendall(f"GET {offset} {-1 if length is None else length} {path}".encode())
+            fields, data = self._recv_response_header(sock)
+            if fields is None:
+                return "Failed to receive file: File not shared"
+            restante = int(fields[1])
+            completo = offset == 0 and length is None
+            file_hash = hashlib.sha256()
+            chunk = self.ajuste.chunk_size(device_ip)
+            inicio = perf_counter()
+            # Um intervalo é gravado sobre o download parcial existente; o arquivo completo vai para um temporário
+            alvo = destination + '.part' if completo else destination
+            # Buffer reutilizado por recv_into, para não alocar um bloco novo a cada recebimento
+            vista = memoryview(bytearray(chunk))
+            with os.fdopen(os.open(alvo, os.O_RDWR | os.O_CREAT | (os.O_TRUNC if completo else 0), 0o666),
+                           'r+b') as file:
+                file.seek(offset)
+                rastreador = self.rastreador
+                while restante > 0:
+                    if not data:
+                        with rastreador.span('recv', 'transferencia') as span:
+                            n = sock.recv_into(vista[:min(chunk, restante)])
+                            span.set(bytes=n)
+                        if not n:
+                            self._results['failed'].inc()
+                            if completo:
+                                file.close()
+                                os.remove(alvo)
+                            return "Failed to receive file: Connection closed"
+                        data = vista[:n]
+                    data = data[:restante]
+                    with rastreador.span('write', 'transferencia') as span:
+                        file.write(data)
+                        span.set(bytes=len(data))
+                    self._bytes_received.inc(len(data))
+                    if completo:
+                        file_hash.update(data)
+                    restante -= len(data)
+                    data = b''
+            duracao = perf_counter() - inicio
+            self.ajuste.record_throughput(device_ip, int(fields[1]), duracao)
+            if duracao > 0:
+                self._throughput.observe(int(fields[1]) / duracao)
+        if completo:
+            os.replace(alvo, destination)
+            self.indice.add(destination, file_hash.hexdigest())
+        self._results['received'].inc()
+        return "File received successfully"
+
+    def _recv_response_header(self, sock: socket.socket):
+        """
+        Lê a linha de cabeçalho de uma resposta a LIST ou GET.
+
+        :param sock: Socket de conexão.
+        :return: Tupla (campos do cabeçalho, bytes já recebidos após o cabeçalho), ou (None, b'') se a
+            resposta não for "OK".
+        """
+        data = b''
+        while b'\n' not in data:
+            chunk = sock.recv(1024)
+            if not chunk:
+                return None, b''
+            data += chunk
+        header, data = data.split(b'\n', 1)
+        fields = header.decode().split()
+        if not fields or fields[0] != "OK":
+            return None, b''
+        return fields, data
+
+    def _send_file_data(self, sock: socket.socket, file, device_ip):
+        """
+        Envia o conteúdo de um arquivo em blocos dimensionados para o dispositivo de destino.
+
+        :param sock: Socket de conexão.
+        :param file: Arquivo aberto em modo binário.
+        :param device_ip: Endereço IP do dispositivo de destino.
+        """
+        chunk = self.ajuste.chunk_size(device_ip)
+        rastreador = self.rastreador
+        enviados = 0
+        inicio = perf_counter()
+        while True:
+            with rastreador.span('read', 'transferencia') as span:
+                data = file.read(chunk)
+                span.set(bytes=len(data))
+            if not data:
+                break
+            with rastreador.span('send', 'transferencia') as span:
+                sock.sendall(data)
+                span.set(bytes=len(data))
+            enviados += len(data)
+            self._bytes_sent.inc(len(data))
+        duracao = perf_counter() - inicio
+        try:
+            send_buffer = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        except OSError:
+            send_buffer = 0
+        self.ajuste.record_sent_throughput(device_ip, enviados, duracao, send_buffer)
+        if duracao > 0:
+            self._throughput.observe(enviados / duracao)
+
+    def _wait_for_receiver_close(self, sock: socket.socket):
+        """
+        Encerra o sentido de envio da conexão e aguarda o receptor fechá-la, o que ele faz depois de gravar
+        o arquivo. Assim, o envio só termina quando os dados saíram do buffer do kernel e foram gravados.
+
+        :param sock: Socket de conexão.
+        """
+        sock.shutdown(socket.SHUT_WR)
+        while sock.recv(1024):
+            pass
+
+    def _send_file_udp(self, sock: socket.socket, file, device_ip, udp_port, size):
+        """
+        Envia o conteúdo de um arquivo por UDP e confirma a integridade pela conexão TCP.
+
+        :param sock: Socket de conexão TCP já autorizada.
+        :param file: Arquivo aberto em modo binário.
+        :param device_ip: Endereço IP do dispositivo de destino.
+        :param udp_port: Porta UDP informada pelo receptor.
+        :param size: Tamanho do arquivo em bytes.
+        :return: Mensagem indicando o sucesso ou falha da operação.
+        """
+        inicio = perf_counter()
+        with self.transporte.udp_socket() as udp_sock:
+            self.ajuste.configure_bulk_socket(udp_sock, device_ip, keep_autotuning=False)
+            try:
+                with self.rastreador.span('send', 'transferencia', bytes=size, mode=MODO_UDP):
+                    file_hash = EmissorUDP(udp_sock, (device_ip, udp_port), file, size).run()
+            except TimeoutError:
+                self._results['failed'].inc()
+                return "Failed to send file: Receiver stopped responding"
+        enviado = perf_counter()
+        self._phases['data'].observe(enviado - inicio)
+        self._bytes_sent.inc(size)
+        if enviado > inicio:
+            self._throughput.observe(size / (enviado - inicio))
+        sock.sendall(f"DONE {file_hash}".encode())
+        try:
+            response = sock.recv(1024).decode()
+        except Exception:
+            response = ''
+        self._phases['finish'].observe(perf_counter() - enviado)
+        if response == "OK":
+            self._results['sent'].inc()
+            return "File sent successfully"
+        self._results['failed'].inc()
+        return "Failed to send file: Integrity check failed"
+
+    def _request_send_authorization(self, sock: socket.socket, file_path, options=None):
         """
         Solicita autorização para enviar um arquivo.
 
+        A mensagem é "SEND <nome>", seguida opcionalmente de linhas "chave=valor" com as opções da transferência.
+
         :param sock: Socket de conexão.
         :param file_path: Caminho do arquivo a ser enviado.
-        :return: True se a autorização for concedida, False caso contrário.
+        :param options: Dicionário com as opções da transferência.
+        :return: Lista com os campos da resposta ("OK" ou "HAVE", se o destino já tiver o conteúdo)
+            se a autorização for concedida, None caso contrário.
         """
         file_name = file_path.split('/')[-1]
         message = f"SEND {file_name}"
+        for key, value in (options or {}).items():
+            message += f"\n{key}={value}"
         sock.sendall(message.encode())
+        # recv já aguarda a resposta (até 60 s); uma espera fixa antes dela fazia o receptor, que
+        # aguarda os dados por apenas 1 s após autorizar, desistir da transferência
         sock.settimeout(60)
-        sleep(1)
         try:
-            response = sock.recv(1024).decode()
-            return response == "OK"
+            response = sock.recv(1024).decode().split()
+            return response if response and response[0] in ("OK", "HAVE") else None
         except Exception:
-            return False
+            return None
+
+    def _parse_send_request(self, message):
+        """
+        Interpreta uma solicitação de envio.
+
+        :param message: Mensagem recebida, começando por "SEND ".
+        :return: Tupla (nome do arquivo, dicionário de opções).
+        """
+        lines = message.split('\n')
+        file_name = lines[0][len('SEND '):]
+        options = dict(line.split('=', 1) for line in lines[1:] if '=' in line)
+        return file_name, options
 
     def _listen_to_incoming_requests(self):
         """
         Escuta solicitações de envio de arquivos de outros dispositivos.
         """
-        with socket.create_server(('', self.transfer_port)) as sock:
+        with self.transporte.create_server(('', self.transfer_port)) as sock:
             sock.settimeout(1)
             while self.running_listener:
                 try:
                     conn, addr = sock.accept()
-                    data = conn.recv(1024)
-                    if data.decode().startswith('SEND '):
-                        file_name = data.decode()[len('SEND '):]
-                        if self.get_user_authorization(addr[0], file_name):
-                            conn.sendall("OK".encode())
-                            self._receive_and_save_file(conn, file_name)
-                        else:
-                            conn.sendall("NO".encode())
-                    conn.close()
                 except socket.timeout:
                     continue
+                try:
+                    self._handle_request(conn, addr)
+                except Exception as e:
+                    # Uma solicitação malformada ou uma conexão interrompida não pode encerrar o listener
+                    print(f"Failed to handle request from {addr[0]}: {e}")
+                finally:
+                    conn.close()
+
+    def _handle_request(self, conn: socket.socket, addr):
+        """
+        Atende a uma solicitação recebida pelo listener (SEND, LIST ou GET).
+
+        :param conn: Conexão socket.
+        :param addr: Endereço do dispositivo remoto.
+        """
+        # Buffers do dispositivo, se ele já foi medido; caso contrário, mantém o ajuste automático do sistema
+        self.ajuste.configure_bulk_socket(conn, addr[0])
+        data = conn.recv(1024)
+        if data.decode().startswith('SEND '):
+            file_name, options = self._parse_send_request(data.decode())
+            with self.rastreador.span('receive_file', 'transferencia', file=file_name, device=addr[0],
+                                      mode=options.get('mode', MODO_TCP)):
+                if options.get('mode') == MODO_UDP:
+                    size = self._parse_udp_size(options)
+                    if size is None or not self.transporte.selectable:
+                        conn.sendall("NO".encode())
+                        return
+                with self.rastreador.span('authorization', 'transferencia'):
+                    autorizado = self.get_user_authorization(addr[0], file_name)
+                if autorizado:
+                    path = os.path.join(self.download_dir, os.path.basename(file_name))
+                    if 'sha256' in options and self.indice.materialize(options['sha256'], path):
+                        conn.sendall("HAVE".encode())
+                    elif options.get('mode') == MODO_UDP:
+                        self._receive_file_udp(conn, path, addr[0], size)
+                    else:
+                        conn.sendall("OK".encode())
+                        self._receive_and_save_file(conn, path, addr[0])
+                else:
+                    conn.sendall("NO".encode())
+        elif data.decode().startswith('LIST '):
+            self._answer_list(conn, data.decode())
+        elif data.decode().startswith('GET '):
+            self._answer_get(conn, data.decode())
+
+    def _parse_udp_size(self, options):
+        """
+        Valida o tamanho informado em uma solicitação de envio por UDP.
+
+        :param options: Opções da solicitação.
+        :return: Tamanho em bytes, ou None se estiver ausente, não for numérico ou exceder TAMANHO_MAX_UDP.
+        """
+        size = options.get('size', '')
+        if not size.isdigit() or int(size) > TAMANHO_MAX_UDP:
+            return None
+        return int(size)
+
+    def _answer_list(self, conn: socket.socket, message):
+        """
+        Responde a uma solicitação "LIST <página> <tamanho da página>" com uma página do catálogo em JSON.
+
+        :param conn: Conexão socket.
+        :param message: Mensagem recebida.
+        """
+        try:
+            _, page, page_size = message.split()
+            listing = self.catalogo.list(int(page), int(page_size))
+        except (AttributeError, ValueError):
+            conn.sendall(b"NO\n")
+            return
+        body = json.dumps(listing).encode()
+        conn.sendall(f"OK {len(body)}\n".encode() + body)
 
-    def _receive_and_save_file(self, conn: socket.socket, file_name):
+    def _answer_get(self, conn: socket.socket, message):
+        """
+        Responde a uma solicitação "GET <posição> <quantidade> <caminho>" com o intervalo pedido de um
+        arquivo do catálogo. Quantidade -1 indica até o fim do arquivo.
+
+        :param conn: Conexão socket.
+        :param message: Mensagem recebida.
+        """
+        try:
+            _, offset, length, path = message.split(' ', 3)
+            offset, length = int(offset), int(length)
+            file_path = self.catalogo.resolve(path) if self.catalogo is not None else None
+            file = open(file_path, 'rb') if file_path is not None and offset >= 0 else None
+        except (ValueError, OSError):
+            file = None
+        if file is None:
+            conn.sendall(b"NO\n")
+            return
+        with file:
+            size = os.fstat(file.fileno()).st_size
+            count = max(0, size - offset) if length < 0 else max(0, min(length, size - offset))
+            conn.sendall(f"OK {count}\n".encode())
+            if count:
+                self._bytes_sent.inc(count)
+                # sendfile evita copiar os dados para o espaço do usuário quando o sistema suporta
+                conn.sendfile(file, offset, count)
+
+    def _receive_and_save_file(self, conn: socket.socket, file_name, device_ip=None):
         """
         Recebe e salva um arquivo enviado por outro dispositivo.
 
+        Os dados são gravados em disco à medida que chegam, em um arquivo temporário que substitui o
+        destino apenas ao final; apenas os últimos bytes, que podem pertencer ao marcador de fim, ficam
+        retidos em memória.
+
         :param conn: Conexão socket.
-        :param file_name: Nome do arquivo a ser salvo.
+        :param file_name: Caminho do arquivo a ser salvo.
+        :param device_ip: Endereço IP do dispositivo remetente.
         """
-        data = b''
+        chunk = self.ajuste.chunk_size(device_ip)
+        retidos = len(MARCADOR_FIM) - 1
+        # Buffer reutilizado por recv_into; os bytes retidos ficam no início e os novos são recebidos após eles
+        buffer = bytearray(retidos + chunk)
+        vista = memoryview(buffer)
+        pendente = 0
+        recebidos = 0
+        file_hash = hashlib.sha256()
+        file = None
+        temporario = file_name + '.part'
+        rastreador = self.rastreador
         conn.settimeout(1)
-        while True:
-            try:
-                data += conn.recv(1024)
-                if data.endswith(b'End of file'):
-                    data = data[:-len(b'End of file')]
+        inicio = perf_counter()
+        try:
+            while True:
+                try:
+                    with rastreador.span('recv', 'transferencia') as span:
+                        n = conn.recv_into(vista[pendente:])
+                        span.set(bytes=n)
+                except socket.timeout:
                     break
-            except socket.timeout:
-                break
-        if data:
-            with open(file_name, 'wb') as file:
-                file.write(data)
+                if not n:
+                    break
+                pendente += n
+                if pendente >= len(MARCADOR_FIM) and vista[pendente - len(MARCADOR_FIM):pendente] == MARCADOR_FIM:
+                    pendente -= len(MARCADOR_FIM)
+                    break
+                if pendente > retidos:
+                    if file is None:
+                        file = open(temporario, 'wb')
+                    corte = pendente - retidos
+                    with rastreador.span('write', 'transferencia') as span:
+                        file.write(vista[:corte])
+                        span.set(bytes=corte)
+                    file_hash.update(vista[:corte])
+                    self._bytes_received.inc(corte)
+                    recebidos += corte
+                    buffer[:retidos] = buffer[corte:pendente]
+                    pendente = retidos
+            if pendente:
+                if file is None:
+                    file = open(temporario, 'wb')
+                with rastreador.span('write', 'transferencia') as span:
+                    file.write(vista[:pendente])
+                    span.set(bytes=pendente)
+                file_hash.update(vista[:pendente])
+                self._bytes_received.inc(pendente)
+                recebidos += pendente
+        except BaseException:
+            if file is not None:
+                file.close()
+                os.remove(temporario)
+            raise
+        if file is not None:
+            file.close()
+        if recebidos:
+            os.replace(temporario, file_name)
+            duracao = perf_counter() - inicio
+            self.ajuste.record_throughput(device_ip, recebidos, duracao)
+            if duracao > 0:
+                self._throughput.observe(recebidos / duracao)
+            self.indice.add(file_name, file_hash.hexdigest())
+            self._results['received'].inc()
         else:
+            self._results['failed'].inc()
+            print("Failed to receive file")
+
+    def _receive_file_udp(self, conn: socket.socket, file_name, device_ip, size):
+        """
+        Recebe um arquivo por UDP e verifica sua integridade com o hash enviado pela conexão TCP.
+
+        Os dados são recebidos em um arquivo temporário, que só substitui o destino depois que o hash
+        confere; uma transferência que falha não altera um arquivo existente com o mesmo nome.
+
+        :param conn: Conexão TCP de controle.
+        :param file_name: Caminho do arquivo a ser salvo.
+        :param device_ip: Endereço IP do dispositivo remetente.
+        :param size: Tamanho do arquivo em bytes.
+        """
+        temporario = file_name + '.part'
+        try:
+            with self.transporte.udp_socket() as udp_sock:
+                udp_sock.bind(('', 0))
+                self.ajuste.configure_bulk_socket(udp_sock, device_ip, keep_autotuning=False)
+                with open(temporario, 'wb') as file:
+                    receptor = ReceptorUDP(udp_sock, file, size, device_ip)
+                    conn.sendall(f"OK {udp_sock.getsockname()[1]}".encode())
+                    with self.rastreador.span('recv', 'transferencia', bytes=size, mode=MODO_UDP):
+                        message = receptor.run(conn)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+        ok = False
+        if message and message.decode().startswith('DONE ') and receptor.complete:
+            file_hash = message.decode()[len('DONE '):]
+            ok = sha256_file(temporario) == file_hash
+            if ok:
+                os.replace(temporario, file_name)
+                self.indice.add(file_name, file_hash)
+                self._bytes_received.inc(size)
+                self._results['received'].inc()
+        try:
+            conn.sendall(("OK" if ok else "FAIL").encode())
+        except OSError:
+            pass
+        if not ok:
+            os.remove(temporario)
+            self._results['failed'].inc()
             print("Failed to receive file")
 
 # Example usage:
@@ -0,0 +1,468 @@
+import hashlib
+import select
+import socket
+import struct
+from collections import deque
+from time import perf_counter
+
+# Carga útil por datagrama, abaixo do MTU típico de Wi-Fi/Ethernet
+TAMANHO_PACOTE = 1400
+
+TIPO_DADOS = 1
+TIPO_ACK = 2
+
+# tipo, número de sequência, instante de envio
+CABECALHO_DADOS = struct.Struct('!BId')
+# tipo, confirmação cumulativa, eco do instante de envio, número de faixas SACK
+CABECALHO_ACK = struct.Struct('!BIdH')
+# início e fim (exclusivo) de uma faixa recebida acima da confirmação cumulativa
+FAIXA_SACK = struct.Struct('!II')
+MAX_FAIXAS_SACK = 32
+
+# O receptor confirma a cada ACK_A_CADA pacotes ou a cada INTERVALO_ACK segundos
+ACK_A_CADA = 16
+INTERVALO_ACK = 0.002
+
+# Taxa e RTT iniciais do controle de congestionamento
+TAXA_INICIAL = 1024 * 1024
+RTT_INICIAL = 0.1
+RTO_MIN = 0.02
+RTO_MAX = 2.0
+
+# Perda por rodada abaixo deste limiar é tratada como ruído do enlace, não como congestionamento
+LIMIAR_PERDA = 0.2
+REDUCAO_POR_PERDA = 0.85
+
+GANHO_PARTIDA = 2.0
+CICLO_GANHOS = (1.25, 0.75, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+JANELA_FILTRO_BANDA = 10
+
+# Sem progresso por este tempo, a transferência é abortada
+TEMPO_LIMITE = 10.0
+
+# Maior arquivo aceito no modo UDP. O receptor mantém um byte de estado por pacote (cerca de 49 MB neste limite)
+TAMANHO_MAX_UDP = 64 * 1024 ** 3
+
+
+def packet_count(size):
+    """
+    Retorna o número de pacotes necessários para transmitir um arquivo.
+
+    :param size: Tamanho do arquivo em bytes.
+    :return: Número de pacotes.
+    """
+    return (size + TAMANHO_PACOTE - 1) // TAMANHO_PACOTE
+
+
+class ControleCongestionamento:
+    """
+    Controle de congestionamento baseado em taxa, tolerante a perdas aleatórias.
+
+    A banda do gargalo é estimada pelo máximo da taxa de entrega das últimas rodadas (uma rodada dura
+    um RTT), e os pacotes são espaçados a essa taxa multiplicada por um ganho cíclico. Perdas isoladas,
+    comuns em Wi-Fi, não reduzem a taxa; apenas rodadas com perda acima de LIMIAR_PERDA são tratadas
+    como congestionamento.
+    """
+
+    def __init__(self, taxa_inicial=TAXA_INICIAL, rtt_inicial=RTT_INICIAL):
+        """
+        Inicializa o controle de congestionamento.
+
+        :param taxa_inicial: Estimativa inicial da banda, em bytes/s.
+        :param rtt_inicial: Estimativa inicial do RTT, em segundos.
+        """
+        self.banda = taxa_inicial
+        self.srtt = rtt_inicial
+        self.rttvar = rtt_inicial / 2
+        self.min_rtt = None
+        self.em_partida = True
+        self._filtro_banda = deque(maxlen=JANELA_FILTRO_BANDA)
+        self._ciclo = 0
+        self._rodadas_sem_crescer = 0
+        self._banda_partida = 0
+        self._inicio_rodada = None
+        self._entregues_rodada = 0
+        self._perdidos_rodada = 0
+
+    @property
+    def ganho(self):
+        return GANHO_PARTIDA if self.em_partida else CICLO_GANHOS[self._ciclo]
+
+    @property
+    def pacing_rate(self):
+        """
+        Taxa de envio atual, em bytes/s.
+        """
+        return self.banda * self.ganho
+
+    @property
+    def cwnd(self):
+        """
+        Quantidade máxima de bytes em voo.
+        """
+        rtt = self.min_rtt if self.min_rtt is not None else self.srtt
+        return max(4 * TAMANHO_PACOTE, int(2 * self.ganho * self.banda * rtt))
+
+    @property
+    def rto(self):
+        """
+        Tempo de retransmissão por timeout, em segundos.
+        """
+        return min(RTO_MAX, max(RTO_MIN, self.srtt + 4 * self.rttvar))
+
+    def on_ack(self, agora, entregues, rtt=None):
+        """
+        Registra bytes confirmados pelo receptor.
+
+        :param agora: Instante atual.
+        :param entregues: Bytes confirmados pela primeira vez neste ACK.
+        :param rtt: Amostra de RTT, em segundos, ou None.
+        """
+        if rtt is not None and rtt > 0:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+            self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+        self._entregues_rodada += entregues
+        self._talvez_fechar_rodada(agora)
+
+    def on_loss(self, agora, perdidos):
+        """
+        Registra bytes considerados perdidos.
+
+        :param agora: Instante atual.
+        :param perdidos: Bytes perdidos.
+        """
+        self._perdidos_rodada += perdidos
+        self._talvez_fechar_rodada(agora)
+
+    def _talvez_fechar_rodada(self, agora):
+        if self._inicio_rodada is None:
+            self._inicio_rodada = agora
+            return
+        duracao = agora - self._inicio_rodada
+        if duracao < self.srtt:
+            return
+
+        total = self._entregues_rodada + self._perdidos_rodada
+        taxa_perda = self._perdidos_rodada / total if total else 0.0
+        if self._entregues_rodada:
+            self._filtro_banda.append(self._entregues_rodada / duracao)
+            self.banda = max(self._filtro_banda)
+
+        if taxa_perda > LIMIAR_PERDA:
+            # Perda persistente: congestionamento real, reduz a estimativa de banda
+            self.banda *= REDUCAO_POR_PERDA
+            self._filtro_banda.clear()
+            self._filtro_banda.append(self.banda)
+            self.em_partida = False
+        elif self.em_partida:
+            # Sai da partida quando a banda para de crescer 25% por três rodadas
+            if self.banda >= 1.25 * self._banda_partida:
+                self._banda_partida = self.banda
+                self._rodadas_sem_crescer = 0
+            else:
+                self._rodadas_sem_crescer += 1
+                if self._rodadas_sem_crescer >= 3:
+                    self.em_partida = False
+        else:
+            self._ciclo = (self._ciclo + 1) % len(CICLO_GANHOS)
+
+        self._inicio_rodada = agora
+        self._entregues_rodada = 0
+        self._perdidos_rodada = 0
+
+
+class EmissorUDP:
+    """
+    Envia o conteúdo de um arquivo por UDP com confirmações seletivas (SACK) e espaçamento de pacotes.
+    """
+
+    def __init__(self, sock: socket.socket, destino, file, size, controle=None):
+        """
+        Inicializa o emissor.
+
+        :param sock: Socket UDP.
+        :param destino: Endereço (ip, porta) do receptor.
+        :param file: Arquivo aberto em modo binário.
+        :param size: Tamanho do arquivo em bytes.
+        :param controle: ControleCongestionamento a ser usado. Se None, um novo é criado.
+        """
+        self.sock = sock
+        self.destino = destino
+        self.file = file
+        self.size = size
+        self.controle = controle if controle is not None else ControleCongestionamento()
+        self.total = packet_count(size)
+        self.hash = hashlib.sha256()
+        self.retransmitidos = 0
+        self._confirmados = bytearray(self.total)
+        self._base = 0
+        self._proximo = 0
+        self._enviado_em = {}
+        self._ordem_envio = deque()
+        self._retransmitir = deque()
+        self._ultimo_envio_confirmado = 0.0
+        self._tokens = 2 * TAMANHO_PACOTE
+        self._ultimo_credito = None
+
+    def run(self):
+        """
+        Envia todos os pacotes e aguarda a confirmação de todos.
+
+        :return: Hash SHA-256 (hexadecimal) do conteúdo enviado.
+        :raises TimeoutError: Se o receptor deixar de confirmar pacotes por TEMPO_LIMITE segundos.
+        """
+        self.sock.setblocking(False)
+        ultimo_progresso = perf_counter()
+        while self._base < self.total:
+            agora = perf_counter()
+            if self._receive_acks(agora):
+                ultimo_progresso = agora
+            elif agora - ultimo_progresso > TEMPO_LIMITE:
+                raise TimeoutError("Receiver stopped acknowledging packets")
+            self._detect_losses(agora)
+            espera = self._send_allowed(agora)
+            if self._base < self.total:
+                select.select([self.sock], [], [], espera)
+        return self.hash.hexdigest()
+
+    def _read_packet(self, seq):
+        self.file.seek(seq * TAMANHO_PACOTE)
+        return self.file.read(TAMANHO_PACOTE)
+
+    def _next_seq(self):
+        """
+        Escolhe o próximo pacote a enviar, priorizando retransmissões.
+
+        :return: Tupla (seq, novo), ou (None, False) se não houver pacote a enviar.
+        """
+        while self._retransmitir:
+            seq = self._retransmitir.popleft()
+            if not self._confirmados[seq]:
+                return seq, False
+        if self._proximo < self.total:
+            self._proximo += 1
+            return self._proximo - 1, True
+        return None, False
+
+    def _send_allowed(self, agora):
+        """
+        Envia os pacotes permitidos pela janela e pela taxa atual.
+
+        :return: Tempo, em segundos, até o próximo envio possível.
+        """
+        taxa = self.controle.pacing_rate
+        rajada = max(2 * TAMANHO_PACOTE, taxa * 0.001)
+        if self._ultimo_credito is not None:
+            self._tokens = min(rajada, self._tokens + taxa * (agora - self._ultimo_credito))
+        self._ultimo_credito = agora
+
+        cwnd = self.controle.cwnd
+        while self._tokens >= TAMANHO_PACOTE and len(self._enviado_em) * TAMANHO_PACOTE < cwnd:
+            seq, novo = self._next_seq()
+            if seq is None:
+                break
+            data = self._read_packet(seq)
+            if novo:
+                # Pacotes novos saem em ordem, então o hash é calculado durante o envio
+                self.hash.update(data)
+            else:
+                self.retransmitidos += 1
+            try:
+                self.sock.sendto(CABECALHO_DADOS.pack(TIPO_DADOS, seq, agora) + data, self.destino)
+            except BlockingIOError:
+                # O pacote já foi lido (e contabilizado no hash); reenvia como retransmissão
+                self._retransmitir.appendleft(seq)
+                break
+            self._enviado_em[seq] = agora
+            self._ordem_envio.append((agora, seq))
+            self._tokens -= TAMANHO_PACOTE
+
+        if self._tokens >= TAMANHO_PACOTE:
+            # Limitado pela janela: espera um ACK ou o próximo timeout
+            return min(self.controle.rto, 0.01)
+        return max(0.0005, (TAMANHO_PACOTE - self._tokens) / taxa)
+
+    def _mark_confirmed(self, inicio, fim):
+        entregues = 0
+        seq = self._confirmados.find(0, inicio, fim)
+        while seq != -1:
+            self._confirmados[seq] = 1
+            entregues += TAMANHO_PACOTE
+            enviado = self._enviado_em.pop(seq, None)
+            if enviado is not None and enviado > self._ultimo_envio_confirmado:
+                self._ultimo_envio_confirmado = enviado
+            seq = self._confirmados.find(0, seq + 1, fim)
+        return entregues
+
+    def _receive_acks(self, agora):
+        progresso = False
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # ICMP de porta inalcançável enquanto o receptor ainda não abriu o socket
+                break
+            if len(data) < CABECALHO_ACK.size or data[0] != TIPO_ACK:
+                continue
+            _, cumulativo, eco, n_faixas = CABECALHO_ACK.unpack_from(data)
+            cumulativo = min(cumulativo, self.total)
+            entregues = 0
+            if cumulativo > self._base:
+                entregues += self._mark_confirmed(self._base, cumulativo)
+                self._base = cumulativo
+            deslocamento = CABECALHO_ACK.size
+            for _ in range(min(n_faixas, MAX_FAIXAS_SACK)):
+                if deslocamento + FAIXA_SACK.size > len(data):
+                    break
+                inicio, fim = FAIXA_SACK.unpack_from(data, deslocamento)
+                deslocamento += FAIXA_SACK.size
+                entregues += self._mark_confirmed(max(inicio, self._base), min(fim, self.total))
+            if entregues:
+                progresso = True
+            self.controle.on_ack(agora, entregues, agora - eco if eco else None)
+        return progresso
+
+    def _detect_losses(self, agora):
+        """
+        Marca como perdidos os pacotes enviados antes de um pacote já confirmado (após uma janela de
+        reordenação) ou sem confirmação após o RTO.
+        """
+        rto = self.controle.rto
+        janela = self.controle.srtt * 1.25
+        perdidos = 0
+        while self._ordem_envio:
+            enviado, seq = self._ordem_envio[0]
+            if self._confirmados[seq] or self._enviado_em.get(seq) != enviado:
+                self._ordem_envio.popleft()
+                continue
+            atraso = agora - enviado
+            if atraso > rto or (enviado < self._ultimo_envio_confirmado and atraso > janela):
+                self._ordem_envio.popleft()
+                del self._enviado_em[seq]
+                self._retransmitir.append(seq)
+                perdidos += TAMANHO_PACOTE
+            else:
+                break
+        if perdidos:
+            self.controle.on_loss(agora, perdidos)
+
+
+class ReceptorUDP:
+    """
+    Recebe pacotes de um EmissorUDP, grava-os no arquivo de destino e envia confirmações seletivas.
+    """
+
+    def __init__(self, sock: socket.socket, file, size, origem_ip=None):
+        """
+        Inicializa o receptor.
+
+        :param sock: Socket UDP já associado a uma porta.
+        :param file: Arquivo aberto para escrita em modo binário.
+        :param size: Tamanho esperado do arquivo em bytes.
+        :param origem_ip: Se informado, pacotes de outros endereços são ignorados.
+        """
+        self.sock = sock
+        self.file = file
+        self.size = size
+        self.origem_ip = origem_ip
+        self.total = packet_count(size)
+        self._recebidos = bytearray(self.total)
+        self._contagem = 0
+        self._cumulativo = 0
+        self._maior = -1
+        self._posicao = 0
+        self._origem = None
+        self._ultimo_eco = 0.0
+        self._desde_ack = 0
+        self._ultimo_ack = 0.0
+
+    @property
+    def complete(self):
+        return self._contagem >= self.total
+
+    def run(self, conn: socket.socket):
+        """
+        Recebe pacotes até que o emissor envie, pela conexão TCP de controle, a mensagem de término.
+
+        :param conn: Conexão TCP de controle com o emissor.
+        :return: Mensagem de término recebida (bytes), ou None em caso de timeout.
+        """
+        self.sock.setblocking(False)
+        ultimo_progresso = perf_counter()
+        while True:
+            prontos, _, _ = select.select([self.sock, conn], [], [], INTERVALO_ACK)
+            agora = perf_counter()
+            if conn in prontos:
+                return conn.recv(1024)
+            if self.sock in prontos:
+                fora_de_ordem = self._receive_packets()
+                ultimo_progresso = agora
+            else:
+                fora_de_ordem = False
+            if self._origem is not None and self._desde_ack and (
+                fora_de_ordem or self.complete or self._desde_ack >= ACK_A_CADA
+                or agora - self._ultimo_ack >= INTERVALO_ACK
+            ):
+                self._send_ack(agora)
+            if agora - ultimo_progresso > TEMPO_LIMITE:
+                return None
+
+    def _receive_packets(self):
+        fora_de_ordem = False
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(CABECALHO_DADOS.size + TAMANHO_PACOTE)
+            except (BlockingIOError, InterruptedError):
+                break
+            if len(data) < CABECALHO_DADOS.size or data[0] != TIPO_DADOS:
+                continue
+            if self.origem_ip is not None and addr[0] != self.origem_ip:
+                continue
+            self._origem = addr
+            _, seq, enviado = CABECALHO_DADOS.unpack_from(data)
+            self._ultimo_eco = enviado
+            self._desde_ack += 1
+            if seq >= self.total or self._recebidos[seq]:
+                # Duplicata: o ACK anterior se perdeu, confirma novamente
+                fora_de_ordem = True
+                continue
+            if seq != self._maior + 1:
+                fora_de_ordem = True
+            self._write(seq, memoryview(data)[CABECALHO_DADOS.size:])
+            self._recebidos[seq] = 1
+            self._contagem += 1
+            self._maior = max(self._maior, seq)
+        return fora_de_ordem
+
+    def _write(self, seq, payload):
+        deslocamento = seq * TAMANHO_PACOTE
+        if deslocamento != self._posicao:
+            self.file.seek(deslocamento)
+        self.file.write(payload)
+        self._posicao = deslocamento + len(payload)
+
+    def _send_ack(self, agora):
+        proximo = self._recebidos.find(0, self._cumulativo)
+        self._cumulativo = self.total if proximo == -1 else proximo
+
+        faixas = []
+        pos = self._cumulativo
+        while pos <= self._maior and len(faixas) < MAX_FAIXAS_SACK:
+            inicio = self._recebidos.find(1, pos, self._maior + 1)
+            if inicio == -1:
+                break
+            fim = self._recebidos.find(0, inicio, self._maior + 1)
+            fim = self._maior + 1 if fim == -1 else fim
+            faixas.append(FAIXA_SACK.pack(inicio, fim))
+            pos = fim
+
+        mensagem = CABECALHO_ACK.pack(TIPO_ACK, self._cumulativo, self._ultimo_eco, len(faixas)) + b''.join(faixas)
+        try:
+            self.sock.sendto(mensagem, self._origem)
+        except (BlockingIOError, OSError):
+            pass
+        self._desde_ack = 0
+        self._ultimo_ack = agora
@@ -0,0 +1,154 @@
+import socket
+from abc import ABC, abstractmethod
+
+
+class Transporte(ABC):
+    """
+    Interface de rede usada por Descoberta e Transferencia.
+
+    Os objetos retornados seguem a API de socket.socket (sendall, recv, sendto, recvfrom, settimeout,
+    close, uso com "with", etc.) na medida em que as classes da aplicação a utilizam.
+
+    Atributos:
+        selectable (bool): Indica se os sockets retornados podem ser usados com select.select,
+            o que é necessário para o modo de transferência UDP.
+    """
+
+    selectable = True
+
+    @abstractmethod
+    def create_connection(self, address, timeout=None):
+        """
+        Abre uma conexão TCP.
+
+        :param address: Tupla (ip, porta) de destino.
+        :param timeout: Timeout da conexão em segundos, ou None.
+        :return: Socket conectado.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def create_server(self, address):
+        """
+        Cria um socket TCP em escuta.
+
+        :param address: Tupla (ip, porta). O IP '' indica o endereço deste transporte.
+        :return: Socket em escuta.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def udp_socket(self):
+        """
+        Cria um socket UDP ainda não associado a uma porta.
+
+        :return: Socket UDP.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_local_ip(self):
+        """
+        Obtém o endereço IP local deste transporte.
+
+        :return: Endereço IP local.
+        """
+        raise NotImplementedError
+
+    def discovery_socket(self, port):
+        """
+        Cria um socket UDP que recebe as mensagens de descoberta enviadas em broadcast para a porta.
+
+        :param port: Porta de descoberta.
+        :return: Socket UDP associado à porta.
+        """
+        sock = self.udp_socket()
+        sock.bind(('', port))
+        return sock
+
+    def broadcast_address(self):
+        """
+        Retorna o endereço de destino das mensagens de descoberta.
+
+        :return: Endereço de broadcast.
+        """
+        return '<broadcast>'
+
+
+class TransporteSocket(Transporte):
+    """
+    Transporte sobre os sockets do sistema operacional.
+    """
+
+    def __init__(self, bind_ip=''):
+        """
+        Inicializa o transporte.
+
+        :param bind_ip: Endereço em que servidores e sockets UDP são associados quando o IP pedido é ''.
+            Usar endereços distintos (por exemplo, 127.0.0.2 e 127.0.0.3) permite várias instâncias no mesmo host.
+            Nesse caso, a porta de descoberta é compartilhada (SO_REUSEADDR) e o broadcast vai para o endereço
+            de broadcast da rede de bind_ip, considerada /8 no loopback e /24 nos demais casos.
+        """
+        self.bind_ip = bind_ip
+
+    def create_connection(self, address, timeout=None):
+        kwargs = {}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        if self.bind_ip:
+            kwargs['source_address'] = (self.bind_ip, 0)
+        return socket.create_connection(address, **kwargs)
+
+    def create_server(self, address):
+        ip, port = address
+        return socket.create_server((ip or self.bind_ip, port))
+
+    def udp_socket(self):
+        if not self.bind_ip:
+            return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        return TransporteSocket._SocketUDP(self.bind_ip)
+
+    def discovery_socket(self, port):
+        if not self.bind_ip:
+            return super().discovery_socket(port)
+        # Associado a todos os endereços, pois o broadcast não é entregue a um socket associado a um IP
+        # unicast; SO_REUSEADDR permite que várias instâncias no mesmo host recebam o mesmo broadcast
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', port))
+        return sock
+
+    def broadcast_address(self):
+        if not self.bind_ip:
+            return super().broadcast_address()
+        partes = self.bind_ip.split('.')
+        if partes[0] == '127':
+            return '127.255.255.255'
+        return '.'.join(partes[:3] + ['255'])
+
+    def get_local_ip(self):
+        if self.bind_ip:
+            return self.bind_ip
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            # Não precisa se conectar de fato, apenas obter o IP local
+            s.connect(('10.254.254.254', 1))
+            ip = s.getsockname()[0]
+        except Exception:
+            ip = '127.0.0.1'
+        finally:
+            s.close()
+        return ip
+
+    class _SocketUDP(socket.socket):
+        """
+        Socket UDP que se associa a bind_ip quando o IP pedido é ''.
+        """
+
+        def __init__(self, bind_ip):
+            super().__init__(socket.AF_INET, socket.SOCK_DGRAM)
+            self._bind_ip = bind_ip
+
+        def bind(self, address):
+            ip, port = address
+            super().bind((ip or self._bind_ip, port))
@@ -1,27 +1,114 @@
+import os
+import threading
 import tkinter as tk
+from time import perf_counter
 from tkinter import ttk
 from tkinter import filedialog, messagebox
 
-from arquivos_em_rede_local.descoberta import Descoberta
-from arquivos_em_rede_local.transferencia import Transferencia
+# Intervalo, em milissegundos, da verificação de que a rede está pronta
+INTERVALO_VERIFICACAO_REDE = 50
 
 class InterfaceGrafica:
     """
     Classe que representa a interface gráfica da aplicação de transferência de arquivos em rede local.
+
+    A inicialização é feita em etapas: a janela é exibida primeiro e, depois do primeiro quadro, os
+    componentes de rede (descoberta, transferência, métricas e rastreamento) são importados e iniciados
+    em uma thread separada. rede_pronta é sinalizado quando eles estão prontos; até lá, os botões
+    que dependem da rede ficam desativados.
     """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, started_at=None):
         """
-        Inicializa a interface gráfica e os componentes de descoberta e transferência de arquivos.
+        Inicializa a interface gráfica. Os componentes de descoberta e transferência de arquivos são
+        iniciados em segundo plano após o primeiro quadro.
 
         :param name: Nome do dispositivo local.
+        :param started_at: Instante (time.perf_counter()) do início da aplicação, usado para medir o tempo
+            até o primeiro quadro. Se None, é o instante da criação da interface.
         """
-        self.descoberta = Descoberta(name)
-        self.descoberta.start_discovery_process()
-        self.transferencia = Transferencia(self.solicitar_envio_arquivo)
+        self.name = name
+        self.started_at = started_at if started_at is not None else perf_counter()
+        self.time_to_first_frame = None
+        self.metricas = None
+        self.servidor_metricas = None
+        self.rastreador = None
+        self.arquivo_rastreamento = None
+        self.descoberta = None
+        self.catalogo = None
+        self.transferencia = None
+        self.rede_pronta = threading.Event()
+        self.erro_rede = None
         self.root = tk.Tk()
         self.root.title("Arquivos em Rede Local")
         self.create_widgets()
+        self.root.bind('<Map>', self._on_map)
+
+    def _on_map(self, event):
+        """
+        Aguarda o desenho da janela recém-exibida para registrar o primeiro quadro.
+        """
+        if event.widget is self.root and self.time_to_first_frame is None:
+            self.root.unbind('<Map>')
+            self.root.after_idle(self._on_first_frame)
+
+    def _on_first_frame(self):
+        """
+        Registra o tempo até o primeiro quadro e inicia os componentes de rede em segundo plano.
+        """
+        self.time_to_first_frame = perf_counter() - self.started_at
+        threading.Thread(target=self._start_network, daemon=True).start()
+        self.root.after(INTERVALO_VERIFICACAO_REDE, self._check_network_ready)
+
+    def _start_network(self):
+        """
+        Importa e inicia os componentes de rede. Executado fora da thread da interface.
+        """
+        try:
+            from arquivos_em_rede_local.armazenamento import IndiceConteudo, CAMINHO_INDICE_PADRAO
+            from arquivos_em_rede_local.catalogo import Catalogo
+            from arquivos_em_rede_local.descoberta import Descoberta
+            from arquivos_em_rede_local.metricas import RegistroMetricas, ServidorMetricas, VARIAVEL_PORTA_METRICAS
+            from arquivos_em_rede_local.rastreamento import from_environment
+            from arquivos_em_rede_local.transferencia import Transferencia
+
+            self.metricas = RegistroMetricas()
+            self.metricas.gauge('arquivos_startup_first_frame_seconds', 'Tempo até o primeiro quadro da interface') \
+                .set(self.time_to_first_frame)
+            # O servidor de métricas só é iniciado se a porta for configurada
+            porta_metricas = os.environ.get(VARIAVEL_PORTA_METRICAS)
+            self.servidor_metricas = ServidorMetricas(self.metricas, int(porta_metricas)) if porta_metricas else None
+            # O rastreamento só é ativado se o arquivo de destino for configurado
+            self.rastreador, self.arquivo_rastreamento = from_environment()
+            self.catalogo = Catalogo()
+            self.transferencia = Transferencia(self.solicitar_envio_arquivo, indice=IndiceConteudo(CAMINHO_INDICE_PADRAO),
+                                               catalogo=self.catalogo, metricas=self.metricas,
+                                               rastreador=self.rastreador, listen=False)
+            descoberta = Descoberta(self.name, metricas=self.metricas, rastreador=self.rastreador)
+            descoberta.start_discovery_process()
+            self.descoberta = descoberta
+            # Outros dispositivos só podem enviar arquivos depois de nos descobrir
+            self.transferencia.start_listener()
+        except Exception as e:
+            self.erro_rede = e
+        self.rede_pronta.set()
+
+    def _check_network_ready(self):
+        """
+        Verifica periodicamente, na thread da interface, se os componentes de rede estão prontos.
+        """
+        if not self.rede_pronta.is_set():
+            self.root.after(INTERVALO_VERIFICACAO_REDE, self._check_network_ready)
+            return
+        if self.erro_rede is not None:
+            self.status_label.config(text="Falha ao iniciar a rede")
+            messagebox.showerror("Erro", f"Falha ao iniciar a rede: {self.erro_rede}")
+            return
+        self.status_label.config(text="")
+        self.atualizar_btn.config(state=tk.NORMAL)
+        self.compartilhar_btn.config(state=tk.NORMAL)
+        # A escuta de respostas da descoberta continua em segundo plano; a lista é atualizada ao fim dela
+        self.root.after(int(self.descoberta.response_window * 1000), self.update_tree_and_buttons)
 
     def create_widgets(self):
         """
@@ -35,9 +122,18 @@ class InterfaceGrafica:
         self.button_frame = tk.Frame(self.root)
         self.button_frame.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.atualizar_btn = tk.Button(self.button_frame, text="Atualizar", command=self.atualizar_dispositivos)
+        self.status_label = tk.Label(self.button_frame, text="Iniciando rede...")
+        self.status_label.pack(fill=tk.X, pady=2)
+
+        # Desativados até a rede estar pronta
+        self.atualizar_btn = tk.Button(self.button_frame, text="Atualizar", command=self.atualizar_dispositivos,
+                                       state=tk.DISABLED)
         self.atualizar_btn.pack(fill=tk.X, pady=2)
 
+        self.compartilhar_btn = tk.Button(self.button_frame, text="Compartilhar pasta", command=self.compartilhar_pasta,
+                                          state=tk.DISABLED)
+        self.compartilhar_btn.pack(fill=tk.X, pady=2)
+
         self.update_tree_and_buttons()
 
     def update_tree_and_buttons(self):
@@ -45,10 +141,12 @@ class InterfaceGrafica:
         Atualiza a árvore de dispositivos conectados e os botões de envio de arquivos.
         """
         for widget in self.button_frame.winfo_children():
-            if isinstance(widget, tk.Button) and widget != self.atualizar_btn:
+            if isinstance(widget, tk.Button) and widget not in (self.atualizar_btn, self.compartilhar_btn):
                 widget.destroy()
 
         self.tree.delete(*self.tree.get_children())
+        if self.descoberta is None:
+            return
         for dispositivo in self.descoberta.get_connected_devices():
             self.tree.insert('', tk.END, values=(dispositivo['name'], dispositivo['ip']))
             btn = tk.Button(self.button_frame, text=f"Enviar para {dispositivo['name']}", command=lambda d=dispositivo: self.enviar_para_dispositivo(d))
@@ -66,6 +164,17 @@ class InterfaceGrafica:
             response = self.transferencia.send(file_path, dispositivo['ip'])
             messagebox.showinfo("Resposta", response)
 
+    def compartilhar_pasta(self):
+        """
+        Abre um diálogo para selecionar uma pasta e a publica no catálogo de arquivos compartilhados.
+
+        A pasta é varrida em segundo plano, então a janela não trava em pastas grandes.
+        """
+        path = filedialog.askdirectory()
+        if path:
+            name = self.catalogo.share(path)
+            messagebox.showinfo("Compartilhamento", f"Pasta {name} compartilhada; os arquivos aparecem após a varredura")
+
     def atualizar_dispositivos(self):
         """
         Atualiza a lista de dispositivos conectados.
@@ -82,14 +191,16 @@ class InterfaceGrafica:
         :param file_name: Nome do arquivo que está sendo solicitado para envio.
         :return: True se o usuário aceitar a solicitação, False caso contrário.
         """
-        dispositivo = self.descoberta.get_device_by_ip(ip)
+        dispositivo = self.descoberta.get_device_by_ip(ip) if self.descoberta is not None else None
         if dispositivo is None:
             return False
         return messagebox.askyesno("Solicitação de Envio", f"{dispositivo['name']} ({dispositivo['ip']}) deseja enviar {file_name} para você. Deseja aceitar?")
 
     def run(self):
         """
-        Inicia o loop principal da interface gráfica.
+        Inicia o loop principal da interface gráfica. Ao final, salva os spans rastreados, se o rastreamento estiver ativo.
         """
         self.root.mainloop()
+        if self.rastreador is not None and self.arquivo_rastreamento:
+            self.rastreador.dump(self.arquivo_rastreamento)
 
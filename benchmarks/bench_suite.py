@@ -0,0 +1,308 @@
+"""
+Suite de benchmarks de Transferencia e Descoberta.
+
+Casos medidos:
+
+- throughput: envio de um arquivo de cada tamanho entre duas instâncias de Transferencia no loopback
+  (127.0.0.2 -> 127.0.0.3), com vazão de ponta a ponta e pico de RSS. Cada tamanho roda em um
+  subprocesso, para que o pico de RSS seja isolado.
+- handshake: latência de send() por arquivo pequeno (mediana e p95). send() só retorna depois que o
+  receptor gravou o arquivo e fechou a conexão, então o tempo cobre o handshake, os dados e a gravação,
+  sem depender de um laço de espera.
+- small_files: vazão, em arquivos/s e bytes/s, de muitos arquivos pequenos enviados em sequência.
+- discovery: tempo até um novo dispositivo descobrir N dispositivos e ser descoberto por todos.
+  Broadcast UDP não funciona no loopback, então este caso usa a RedeSimulada.
+- startup: tempo desde o início de um novo interpretador até o primeiro quadro da interface gráfica
+  (meta: menos de 200 ms). Sem display, o caso é marcado como ignorado.
+
+Os arquivos recebidos vão para um diretório temporário; o caso de 10 GB precisa de 20 GB livres.
+
+Uso:
+    python benchmarks/bench_suite.py --max-size 128M --output resultado.json
+    python benchmarks/bench_suite.py --compare resultado_anterior.json
+
+O resultado é impresso (ou salvo) em JSON. Com --compare, a variação de cada métrica em relação a
+um resultado anterior também é impressa.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from time import perf_counter, sleep
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from arquivos_em_rede_local.descoberta import Descoberta
+from arquivos_em_rede_local.rede_simulada import RedeSimulada
+from arquivos_em_rede_local.transferencia import Transferencia
+from arquivos_em_rede_local.transporte import TransporteSocket
+
+TAMANHOS = ['1K', '64K', '1M', '16M', '128M', '1G', '10G']
+PORTA = 23100
+IP_EMISSOR = '127.0.0.2'
+IP_RECEPTOR = '127.0.0.3'
+BLOCO = os.urandom(1024 * 1024)
+
+# Meta do tempo até o primeiro quadro, em segundos
+META_PRIMEIRO_QUADRO = 0.2
+
+# Executado em um interpretador novo, para que nenhuma importação já esteja em cache
+CODIGO_STARTUP = '''
+import json, sys, time
+inicio = time.perf_counter() - (time.time_ns() - int(sys.argv[1])) / 1e9
+import tkinter
+from arquivos_em_rede_local.visualizacao import InterfaceGrafica
+try:
+    app = InterfaceGrafica('bench', started_at=inicio)
+except tkinter.TclError:
+    print(json.dumps(None))
+    sys.exit()
+while app.time_to_first_frame is None:
+    app.root.update()
+print(json.dumps(app.time_to_first_frame))
+app.root.destroy()
+'''
+
+# Métricas em que um valor maior é melhor; nas demais, menor é melhor
+MAIOR_MELHOR = ('throughput', 'files_per_second')
+
+
+def parse_size(texto):
+    """
+    Converte tamanhos como '64K', '16M' e '10G' em bytes.
+    """
+    multiplicadores = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    texto = texto.strip().upper()
+    if texto[-1] in multiplicadores:
+        return int(float(texto[:-1]) * multiplicadores[texto[-1]])
+    return int(texto)
+
+
+def peak_rss_bytes():
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é dado em KiB no Linux e em bytes no macOS
+    return maximo if sys.platform == 'darwin' else maximo * 1024
+
+
+def write_file(path, size, prefixo=b''):
+    with open(path, 'wb') as file:
+        if prefixo:
+            file.write(prefixo[:size])
+            size -= min(size, len(prefixo))
+        while size > 0:
+            file.write(BLOCO[:size])
+            size -= min(size, len(BLOCO))
+
+
+class ParDeTransferencia:
+    """
+    Emissor e receptor de Transferencia no loopback, cada um em seu endereço.
+    """
+
+    def __init__(self, tmp):
+        self.download_dir = os.path.join(tmp, 'recebidos')
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.receptor = Transferencia(lambda ip, name: True, transfer_port=PORTA,
+                                      transporte=TransporteSocket(IP_RECEPTOR), download_dir=self.download_dir)
+        self.emissor = Transferencia(lambda ip, name: False, transfer_port=PORTA,
+                                     transporte=TransporteSocket(IP_EMISSOR))
+        sleep(1.5)  # Aguarda os listeners
+
+    def send(self, path):
+        """
+        Envia um arquivo e confere que ele está completo no destino.
+
+        :return: Tempo de send() em segundos; send() retorna quando o receptor já gravou o arquivo.
+        """
+        destino = os.path.join(self.download_dir, os.path.basename(path))
+        inicio = perf_counter()
+        resultado = self.emissor.send(path, IP_RECEPTOR)
+        duracao = perf_counter() - inicio
+        if resultado != "File sent successfully" or os.path.getsize(destino) != os.path.getsize(path):
+            raise RuntimeError(f"Transfer of {path} failed: {resultado}")
+        return duracao
+
+    def close(self):
+        for t in (self.emissor, self.receptor):
+            t.running_listener = False
+        for t in (self.emissor, self.receptor):
+            t.listen_to_incoming_requests_thread.join()
+
+
+def case_throughput(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        origem = os.path.join(tmp, 'origem.bin')
+        write_file(origem, size)
+        par = ParDeTransferencia(tmp)
+        try:
+            duracao = par.send(origem)
+        finally:
+            par.close()
+    return {'case': 'throughput', 'size': size, 'seconds': duracao,
+            'throughput': size / duracao, 'peak_rss': peak_rss_bytes()}
+
+
+def case_handshake(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        par = ParDeTransferencia(tmp)
+        latencias = []
+        try:
+            for i in range(count):
+                # Conteúdos distintos, para que o receptor não reaproveite uma cópia local
+                origem = os.path.join(tmp, f'h{i}.bin')
+                with open(origem, 'wb') as file:
+                    file.write(bytes([i % 256]) + os.urandom(16))
+                latencias.append(par.send(origem))
+        finally:
+            par.close()
+    latencias.sort()
+    return {'case': 'handshake', 'files': count, 'median': statistics.median(latencias),
+            'p95': latencias[int(0.95 * (len(latencias) - 1))]}
+
+
+def case_small_files(count, size):
+    with tempfile.TemporaryDirectory() as tmp:
+        origens = []
+        for i in range(count):
+            origem = os.path.join(tmp, f's{i}.bin')
+            write_file(origem, size, prefixo=os.urandom(16))
+            origens.append(origem)
+        par = ParDeTransferencia(tmp)
+        try:
+            inicio = perf_counter()
+            for origem in origens:
+                par.send(origem)
+            duracao = perf_counter() - inicio
+        finally:
+            par.close()
+    return {'case': 'small_files', 'files': count, 'size': size, 'seconds': duracao,
+            'files_per_second': count / duracao, 'throughput': count * size / duracao}
+
+
+def case_discovery(peers, latency):
+    rede = RedeSimulada(latency=latency)
+    dispositivos = [Descoberta(f'peer{i}', transporte=rede.transport(f'10.0.{i // 250}.{i % 250 + 1}'),
+                               response_window=1) for i in range(peers)]
+    for dispositivo in dispositivos:
+        dispositivo.discovery_listener_thread.start()
+    novo = Descoberta('novo', transporte=rede.transport('10.1.0.1'), response_window=1)
+    while len(rede._udp_por_porta.get(novo.discovery_port, ())) < peers:
+        sleep(0.001)
+
+    inicio = perf_counter()
+    novo.start_discovery_process()
+    convergiu = False
+    while perf_counter() - inicio < 60:
+        if len(novo.get_connected_devices()) >= peers and all(d.get_connected_devices() for d in dispositivos):
+            convergiu = True
+            break
+        sleep(0.001)
+    duracao = perf_counter() - inicio
+
+    for dispositivo in dispositivos + [novo]:
+        dispositivo.running_discovery = False
+    for dispositivo in dispositivos + [novo]:
+        dispositivo.discovery_listener_thread.join()
+    novo.listen_for_responses_thread.join()
+    return {'case': 'discovery', 'peers': peers, 'latency': latency, 'converged': convergiu, 'seconds': duracao}
+
+
+def case_startup():
+    saida = subprocess.run([sys.executable, '-c', CODIGO_STARTUP, str(time.time_ns())], cwd=RAIZ,
+                           check=True, capture_output=True, text=True).stdout
+    duracao = json.loads(saida.strip().splitlines()[-1])
+    if duracao is None:
+        return {'case': 'startup', 'skipped': 'no display'}
+    return {'case': 'startup', 'seconds': duracao, 'within_budget': duracao < META_PRIMEIRO_QUADRO}
+
+
+def run_subprocess(*args):
+    """
+    Executa um caso em um subprocesso e retorna o JSON impresso por ele.
+    """
+    saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', *map(str, args)],
+                           check=True, capture_output=True, text=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def compare(anterior, atual):
+    """
+    Retorna a variação percentual de cada métrica em relação a um resultado anterior.
+    """
+    def chave(resultado):
+        return (resultado['case'], resultado.get('size'), resultado.get('peers'), resultado.get('files'))
+
+    anteriores = {chave(r): r for r in anterior['results']}
+    variacoes = []
+    for resultado in atual['results']:
+        base = anteriores.get(chave(resultado))
+        if base is None:
+            continue
+        for metrica in ('seconds', 'throughput', 'peak_rss', 'median', 'p95', 'files_per_second'):
+            if metrica in resultado and base.get(metrica):
+                variacao = (resultado[metrica] - base[metrica]) / base[metrica] * 100
+                piora = variacao < 0 if metrica in MAIOR_MELHOR else variacao > 0
+                variacoes.append({'case': resultado['case'], 'key': chave(resultado)[1:], 'metric': metrica,
+                                  'before': base[metrica], 'after': resultado[metrica],
+                                  'change_percent': variacao, 'regression': piora})
+    return variacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-size', default='128M', help='Maior tamanho de arquivo no caso throughput (até 10G)')
+    parser.add_argument('--handshakes', type=int, default=50, help='Arquivos no caso handshake')
+    parser.add_argument('--small-files', type=int, default=500, help='Arquivos no caso small_files')
+    parser.add_argument('--small-file-size', default='4K', help='Tamanho dos arquivos no caso small_files')
+    parser.add_argument('--peers', default='10,50,100,250,500', help='Números de dispositivos no caso discovery')
+    parser.add_argument('--latency', type=float, default=0.0005, help='Latência da rede simulada no caso discovery')
+    parser.add_argument('--output', help='Arquivo onde salvar o resultado em JSON')
+    parser.add_argument('--compare', help='Resultado anterior em JSON para comparação')
+    parser.add_argument('--case', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        # Execução de um único caso em subprocesso
+        caso, *parametros = args.case
+        casos = {'throughput': case_throughput, 'handshake': case_handshake, 'small_files': case_small_files}
+        print(json.dumps(casos[caso](*map(int, parametros))))
+        return
+
+    maximo = parse_size(args.max_size)
+    resultados = [run_subprocess('throughput', parse_size(t)) for t in TAMANHOS if parse_size(t) <= maximo]
+    resultados.append(run_subprocess('handshake', args.handshakes))
+    resultados.append(run_subprocess('small_files', args.small_files, parse_size(args.small_file_size)))
+    for peers in map(int, args.peers.split(',')):
+        resultados.append(case_discovery(peers, args.latency))
+    resultados.append(case_startup())
+
+    resultado = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': resultados,
+    }
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            resultado['comparison'] = compare(json.load(file), resultado)
+
+    texto = json.dumps(resultado, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(texto + '\n')
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
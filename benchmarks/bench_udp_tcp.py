@@ -0,0 +1,237 @@
+"""
+Compara o modo UDP com o TCP em um enlace de loopback com perdas simuladas.
+
+O enlace é simulado por proxies locais com atraso, banda limitada e perda aleatória:
+
+- No UDP, o proxy descarta datagramas de verdade, nos dois sentidos.
+- No TCP, o loopback nunca perde segmentos, então o proxy modela o comportamento de um emissor Reno:
+  libera uma janela de segmentos por RTT, cresce a janela em um segmento por RTT sem perdas, e a cada
+  perda gasta um RTT extra na retransmissão e divide a janela por dois. O número do TCP é, portanto,
+  modelado e não medido, e vem marcado com "method": "modelled" no JSON; o do UDP vem com
+  "method": "measured".
+
+Uso:
+    python benchmarks/bench_udp_tcp.py --size 10000000 --loss 0.01 --rtt 0.01 --bandwidth 6250000
+
+O resultado é impresso em JSON.
+"""
+import argparse
+import heapq
+import io
+import json
+import os
+import random
+import select
+import socket
+import sys
+import threading
+from time import perf_counter, sleep
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arquivos_em_rede_local.transferencia_udp import EmissorUDP, ReceptorUDP
+
+MSS = 1448
+FILA_MAXIMA = 256
+
+
+class EnlaceSimulado:
+    """
+    Um sentido de um enlace com atraso de propagação, banda limitada, fila finita e perda aleatória.
+    """
+
+    def __init__(self, atraso, banda, perda, semente):
+        self.atraso = atraso
+        self.banda = banda
+        self.perda = perda
+        self.random = random.Random(semente)
+        self.livre_em = 0.0
+
+    def schedule(self, agora, tamanho):
+        """
+        Retorna o instante de entrega de um pacote, ou None se ele for descartado.
+        """
+        if self.random.random() < self.perda:
+            return None
+        inicio = max(agora, self.livre_em)
+        if self.banda and (inicio - agora) * self.banda > FILA_MAXIMA * MSS:
+            return None
+        self.livre_em = inicio + (tamanho / self.banda if self.banda else 0)
+        return self.livre_em + self.atraso
+
+
+class ProxyUDPComPerda(threading.Thread):
+    """
+    Encaminha datagramas entre um cliente e um destino através de dois EnlaceSimulado.
+    """
+
+    def __init__(self, destino, atraso, banda, perda, semente=0):
+        super().__init__(daemon=True)
+        self.destino = destino
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.endereco = self.sock.getsockname()
+        self.ida = EnlaceSimulado(atraso, banda, perda, semente)
+        self.volta = EnlaceSimulado(atraso, banda, perda, semente + 1)
+        self.cliente = None
+        self.running = True
+        self._fila = []
+        self._ordem = 0
+
+    def run(self):
+        while self.running:
+            agora = perf_counter()
+            while self._fila and self._fila[0][0] <= agora:
+                _, _, data, addr = heapq.heappop(self._fila)
+                self.sock.sendto(data, addr)
+            espera = max(0.0, self._fila[0][0] - agora) if self._fila else 0.05
+            prontos, _, _ = select.select([self.sock], [], [], espera)
+            if not prontos:
+                continue
+            data, addr = self.sock.recvfrom(65536)
+            if addr == self.destino:
+                enlace, alvo = self.volta, self.cliente
+            else:
+                self.cliente = addr
+                enlace, alvo = self.ida, self.destino
+            entrega = enlace.schedule(perf_counter(), len(data))
+            if entrega is not None and alvo is not None:
+                self._ordem += 1
+                heapq.heappush(self._fila, (entrega, self._ordem, data, alvo))
+        self.sock.close()
+
+
+class ProxyTCPReno(threading.Thread):
+    """
+    Encaminha uma conexão TCP aplicando o modelo de um emissor Reno sobre um enlace com perdas.
+    """
+
+    def __init__(self, destino, rtt, banda, perda, semente=0):
+        super().__init__(daemon=True)
+        self.destino = destino
+        self.rtt = rtt
+        self.banda = banda
+        self.perda = perda
+        self.random = random.Random(semente)
+        self.servidor = socket.create_server(('127.0.0.1', 0))
+        self.endereco = self.servidor.getsockname()
+
+    def run(self):
+        conn, _ = self.servidor.accept()
+        self.servidor.close()
+        janela = 10
+        janela_maxima = max(10, int(self.banda * self.rtt / MSS) * 2) if self.banda else 1 << 20
+        with conn, socket.create_connection(self.destino) as upstream:
+            while True:
+                data = self._read(conn, janela * MSS)
+                if not data:
+                    break
+                segmentos = (len(data) + MSS - 1) // MSS
+                perdas = sum(self.random.random() < self.perda for _ in range(segmentos))
+                rodada = max(self.rtt, len(data) / self.banda if self.banda else 0)
+                sleep(rodada)
+                if perdas:
+                    # Retransmissão rápida: um RTT extra e janela reduzida pela metade
+                    sleep(self.rtt)
+                    janela = max(2, janela // 2)
+                else:
+                    janela = min(janela_maxima, janela + 1)
+                upstream.sendall(data)
+
+    def _read(self, conn, limite):
+        partes = []
+        total = 0
+        while total < limite:
+            data = conn.recv(limite - total)
+            if not data:
+                break
+            partes.append(data)
+            total += len(data)
+        return b''.join(partes)
+
+
+def bench_tcp(content, rtt, banda, perda):
+    receptor = socket.create_server(('127.0.0.1', 0))
+    proxy = ProxyTCPReno(receptor.getsockname(), rtt, banda, perda)
+    proxy.start()
+    recebido = []
+
+    def receive():
+        conn, _ = receptor.accept()
+        total = 0
+        with conn:
+            while True:
+                data = conn.recv(1024 * 1024)
+                if not data:
+                    break
+                total += len(data)
+        recebido.append(total)
+
+    t = threading.Thread(target=receive, daemon=True)
+    t.start()
+    inicio = perf_counter()
+    with socket.create_connection(proxy.endereco) as sock:
+        sock.sendall(content)
+    t.join()
+    duracao = perf_counter() - inicio
+    receptor.close()
+    return {
+        'method': 'modelled',
+        'seconds': duracao,
+        'throughput': len(content) / duracao,
+        'complete': recebido == [len(content)],
+    }
+
+
+def bench_udp(content, rtt, banda, perda):
+    receptor_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receptor_sock.bind(('127.0.0.1', 0))
+    proxy = ProxyUDPComPerda(receptor_sock.getsockname(), rtt / 2, banda, perda)
+    proxy.start()
+    controle_receptor, controle_emissor = socket.socketpair()
+    saida = io.BytesIO()
+    receptor = ReceptorUDP(receptor_sock, saida, len(content))
+    t = threading.Thread(target=receptor.run, args=(controle_receptor,), daemon=True)
+    t.start()
+
+    inicio = perf_counter()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as emissor_sock:
+        emissor = EmissorUDP(emissor_sock, proxy.endereco, io.BytesIO(content), len(content))
+        emissor.run()
+    duracao = perf_counter() - inicio
+    controle_emissor.sendall(b'DONE')
+    t.join()
+    proxy.running = False
+    for s in (receptor_sock, controle_receptor, controle_emissor):
+        s.close()
+    return {
+        'method': 'measured',
+        'seconds': duracao,
+        'throughput': len(content) / duracao,
+        'complete': saida.getvalue() == content,
+        'retransmitted_packets': emissor.retransmitidos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=10 * 1000 * 1000, help='Tamanho do arquivo em bytes')
+    parser.add_argument('--loss', type=float, default=0.01, help='Probabilidade de perda por pacote')
+    parser.add_argument('--rtt', type=float, default=0.01, help='RTT do enlace em segundos')
+    parser.add_argument('--bandwidth', type=float, default=6.25e6, help='Banda do enlace em bytes/s (0 = ilimitada)')
+    args = parser.parse_args()
+
+    content = os.urandom(args.size)
+    resultado = {
+        'size': args.size,
+        'loss': args.loss,
+        'rtt': args.rtt,
+        'bandwidth': args.bandwidth,
+        'tcp': bench_tcp(content, args.rtt, args.bandwidth, args.loss),
+        'udp': bench_udp(content, args.rtt, args.bandwidth, args.loss),
+    }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,17 @@
+from time import perf_counter
+
+# Marcado antes das demais importações, para que o tempo até o primeiro quadro as inclua
+INICIO = perf_counter()
+
 from arquivos_em_rede_local.visualizacao import InterfaceGrafica
-import socket
-import getpass
 
 def main():
+    import socket
+    import getpass
+
     username = f'{getpass.getuser()}:{socket.gethostname()}'
-    app = InterfaceGrafica(username)
+    app = InterfaceGrafica(username, started_at=INICIO)
     app.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,64 @@
+"""
+Auxiliares dos testes que transferem arquivos entre duas instâncias de Transferencia em uma RedeSimulada.
+"""
+import os
+from contextlib import contextmanager
+from time import sleep
+
+from arquivos_em_rede_local.rede_simulada import RedeSimulada
+from arquivos_em_rede_local.transferencia import Transferencia
+
+IP_EMISSOR = '10.0.0.1'
+IP_RECEPTOR = '10.0.0.2'
+
+
+def write_file(directory, name, content):
+    """
+    Cria um arquivo com o conteúdo informado.
+
+    :return: Caminho do arquivo.
+    """
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def stop_listeners(*transferencias):
+    """
+    Encerra os listeners e aguarda o fim do atendimento em andamento, que termina antes de o listener sair.
+    """
+    for t in transferencias:
+        t.running_listener = False
+    for t in transferencias:
+        if t.listen_to_incoming_requests_thread.is_alive():
+            t.listen_to_incoming_requests_thread.join()
+
+
+@contextmanager
+def transfer_pair(tmp, rede=None, receptor=None, emissor=None):
+    """
+    Cria um receptor (IP_RECEPTOR) e um emissor (IP_EMISSOR) de Transferencia em uma RedeSimulada.
+
+    O receptor autoriza todos os envios e salva os arquivos em <tmp>/recebidos; o emissor recusa todos e
+    não inicia o listener. Ao entrar, aguarda o listener do receptor; ao sair, encerra os listeners.
+
+    :param tmp: Diretório temporário do teste.
+    :param rede: RedeSimulada usada. Se None, uma rede sem atraso nem perdas.
+    :param receptor: Argumentos do receptor que substituem ou complementam os padrões.
+    :param emissor: Argumentos do emissor que substituem ou complementam os padrões.
+    :return: Tupla (receptor, emissor).
+    """
+    rede = rede if rede is not None else RedeSimulada()
+    download_dir = os.path.join(tmp, 'recebidos')
+    os.makedirs(download_dir, exist_ok=True)
+    receptor = Transferencia(**{'get_user_authorization': lambda ip, name: True, 'download_dir': download_dir,
+                                'transporte': rede.transport(IP_RECEPTOR), **(receptor or {})})
+    emissor = Transferencia(**{'get_user_authorization': lambda ip, name: False, 'listen': False,
+                               'transporte': rede.transport(IP_EMISSOR), **(emissor or {})})
+    try:
+        while (IP_RECEPTOR, receptor.transfer_port) not in rede._servidores:
+            sleep(0.01)
+        yield receptor, emissor
+    finally:
+        stop_listeners(receptor, emissor)
@@ -0,0 +1,94 @@
+import unittest
+import socket
+
+from arquivos_em_rede_local.ajuste import (
+    AjusteSocket,
+    configure_control_socket,
+    TAMANHO_CHUNK_MIN,
+    TAMANHO_CHUNK_MAX,
+    TAMANHO_BUFFER_MIN,
+    TAMANHO_BUFFER_MAX,
+)
+
+class TestAjusteSocket(unittest.TestCase):
+    def test_default_params(self):
+        """
+        Testa os valores padrão para um dispositivo ainda não medido.
+        """
+        ajuste = AjusteSocket()
+        self.assertEqual(ajuste.chunk_size('10.0.0.1'), TAMANHO_CHUNK_MIN)
+        self.assertEqual(ajuste.buffer_size('10.0.0.1'), TAMANHO_BUFFER_MIN)
+
+    def test_chunk_grows_with_throughput(self):
+        """
+        Testa que o tamanho do bloco cresce com a vazão observada e é limitado.
+        """
+        ajuste = AjusteSocket()
+        ajuste.record_throughput('10.0.0.1', 100 * 1024 * 1024, 1.0)
+        chunk = ajuste.chunk_size('10.0.0.1')
+        self.assertGreater(chunk, TAMANHO_CHUNK_MIN)
+        self.assertEqual(chunk & (chunk - 1), 0)
+
+        ajuste.record_throughput('10.0.0.2', 100 * 1024 * 1024 * 1024, 1.0)
+        self.assertEqual(ajuste.chunk_size('10.0.0.2'), TAMANHO_CHUNK_MAX)
+
+    def test_buffer_follows_bandwidth_delay_product(self):
+        """
+        Testa que o buffer acompanha o produto banda-atraso.
+        """
+        ajuste = AjusteSocket()
+        ajuste.record_rtt('10.0.0.1', 0.05)
+        ajuste.record_throughput('10.0.0.1', 10 * 1024 * 1024, 1.0)
+        self.assertEqual(ajuste.buffer_size('10.0.0.1'), int(2 * 10 * 1024 * 1024 * 0.05))
+
+        ajuste.record_rtt('10.0.0.2', 10.0)
+        ajuste.record_throughput('10.0.0.2', 10 * 1024 * 1024, 1.0)
+        self.assertEqual(ajuste.buffer_size('10.0.0.2'), TAMANHO_BUFFER_MAX)
+
+    def test_params_are_cached_per_peer(self):
+        """
+        Testa que as medições de um dispositivo não afetam outro e são suavizadas.
+        """
+        ajuste = AjusteSocket()
+        ajuste.record_rtt('10.0.0.1', 0.010)
+        ajuste.record_rtt('10.0.0.1', 0.020)
+        self.assertAlmostEqual(ajuste.get_peer_params('10.0.0.1')['rtt'], 0.013)
+        self.assertNotEqual(ajuste.get_peer_params('10.0.0.2')['rtt'], 0.013)
+
+    def test_small_transfers_do_not_update_throughput(self):
+        """
+        Testa que transferências pequenas não são usadas como amostra de vazão.
+        """
+        ajuste = AjusteSocket()
+        antes = ajuste.get_peer_params('10.0.0.1')['vazao']
+        ajuste.record_throughput('10.0.0.1', 10, 1.0)
+        self.assertEqual(ajuste.get_peer_params('10.0.0.1')['vazao'], antes)
+
+    def test_sender_samples_exclude_send_buffer(self):
+        """
+        Testa que o emissor não usa como amostra de vazão envios que cabem no buffer de envio.
+        """
+        ajuste = AjusteSocket()
+        ajuste.record_sent_throughput('10.0.0.1', 1024 * 1024, 0.007, 2 * 1024 * 1024)
+        self.assertFalse(ajuste.has_measurements('10.0.0.1'))
+        ajuste.record_sent_throughput('10.0.0.1', 10 * 1024 * 1024, 1.0, 1024 * 1024)
+        self.assertEqual(ajuste.get_peer_params('10.0.0.1')['vazao'], 9 * 1024 * 1024)
+
+    def test_configure_sockets(self):
+        """
+        Testa a configuração dos sockets de controle e de dados em massa.
+        """
+        ajuste = AjusteSocket()
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            configure_control_socket(sock)
+            self.assertEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 1)
+            padrao = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            # Dispositivo ainda não medido: os buffers do sistema são mantidos
+            ajuste.configure_bulk_socket(sock, '10.0.0.1')
+            self.assertEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), padrao)
+            ajuste.record_throughput('10.0.0.1', 10 * 1024 * 1024, 0.01)
+            ajuste.configure_bulk_socket(sock, '10.0.0.1')
+            self.assertGreaterEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), TAMANHO_BUFFER_MIN)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import hashlib
+import os
+import tempfile
+
+from arquivos_em_rede_local.armazenamento import IndiceConteudo, sha256_file
+
+class TestIndiceConteudo(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'a.txt')
+        self.content = b'conteudo de teste'
+        self.hash = hashlib.sha256(self.content).hexdigest()
+        with open(self.path, 'wb') as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_sha256_file(self):
+        """
+        Testa o cálculo do hash de um arquivo.
+        """
+        self.assertEqual(sha256_file(self.path), self.hash)
+
+    def test_add_and_lookup(self):
+        """
+        Testa a consulta de um arquivo indexado.
+        """
+        indice = IndiceConteudo()
+        indice.add(self.path, self.hash)
+        self.assertEqual(indice.lookup(self.hash), self.path)
+        self.assertIsNone(indice.lookup('0' * 64))
+
+    def test_lookup_discards_changed_file(self):
+        """
+        Testa que um arquivo alterado depois da indexação não é retornado.
+        """
+        indice = IndiceConteudo()
+        indice.add(self.path, self.hash)
+        with open(self.path, 'ab') as f:
+            f.write(b'!')
+        self.assertIsNone(indice.lookup(self.hash))
+        self.assertEqual(len(indice), 0)
+
+    def test_hash_file_uses_index(self):
+        """
+        Testa que o hash de um arquivo inalterado vem do índice.
+        """
+        indice = IndiceConteudo()
+        indice.add(self.path, 'hash-do-indice')
+        self.assertEqual(indice.hash_file(self.path), 'hash-do-indice')
+
+    def test_materialize(self):
+        """
+        Testa a criação de um arquivo a partir de um conteúdo já indexado.
+        """
+        indice = IndiceConteudo()
+        indice.add(self.path, self.hash)
+        destination = os.path.join(self.dir.name, 'b.txt')
+
+        self.assertTrue(indice.materialize(self.hash, destination))
+        with open(destination, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(indice.materialize('0' * 64, os.path.join(self.dir.name, 'c.txt')))
+
+    def test_hash_file_does_not_index(self):
+        """
+        Testa que calcular o hash de um arquivo não o acrescenta ao índice.
+        """
+        indice = IndiceConteudo()
+        self.assertEqual(indice.hash_file(self.path), self.hash)
+        self.assertEqual(len(indice), 0)
+        self.assertIsNone(indice.lookup(self.hash))
+
+    def test_materialize_copies(self):
+        """
+        Testa que o arquivo criado é uma cópia independente e que um destino existente é substituído,
+        não truncado.
+        """
+        indice = IndiceConteudo()
+        indice.add(self.path, self.hash)
+        copia = os.path.join(self.dir.name, 'copia.txt')
+        with open(copia, 'wb') as f:
+            f.write(b'conteudo antigo')
+        with open(copia, 'rb') as antigo:
+            self.assertTrue(indice.materialize(self.hash, copia))
+            self.assertEqual(antigo.read(), b'conteudo antigo')
+        self.assertNotEqual(os.stat(copia).st_ino, os.stat(self.path).st_ino)
+        with open(copia, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_journal_is_reloaded(self):
+        """
+        Testa que o índice é recarregado do diário, incluindo remoções.
+        """
+        index_path = os.path.join(self.dir.name, 'indice.jsonl')
+        other = os.path.join(self.dir.name, 'b.txt')
+        with open(other, 'wb') as f:
+            f.write(b'outro')
+
+        indice = IndiceConteudo(index_path)
+        indice.add(self.path, self.hash)
+        indice.add(other, 'outro-hash')
+        indice.remove(other)
+
+        recarregado = IndiceConteudo(index_path)
+        self.assertEqual(recarregado.lookup(self.hash), self.path)
+        self.assertIsNone(recarregado.lookup('outro-hash'))
+
+    def test_journal_is_compacted(self):
+        """
+        Testa que o diário é compactado quando acumula muitas alterações.
+        """
+        index_path = os.path.join(self.dir.name, 'indice.jsonl')
+        indice = IndiceConteudo(index_path)
+        for _ in range(300):
+            indice.add(self.path, self.hash)
+        with open(index_path) as f:
+            self.assertLess(len(f.readlines()), 300)
+        self.assertEqual(IndiceConteudo(index_path).lookup(self.hash), self.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from arquivos_em_rede_local.catalogo import Catalogo
+
+class TestCatalogo(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.dir.name, 'compartilhada')
+        os.makedirs(os.path.join(self.root, 'sub'))
+        self.write('a.txt', b'a')
+        self.write('sub/b.txt', b'bb')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, relative, content):
+        with open(os.path.join(self.root, *relative.split('/')), 'wb') as f:
+            f.write(content)
+
+    def test_share_and_list(self):
+        """
+        Testa a listagem de uma pasta compartilhada.
+        """
+        catalogo = Catalogo()
+        self.assertEqual(catalogo.share(self.root), 'compartilhada')
+        self.assertTrue(catalogo.wait_for_scan(5))
+        listing = catalogo.list()
+        self.assertEqual(listing['total'], 2)
+        self.assertEqual([e['path'] for e in listing['entries']], ['compartilhada/a.txt', 'compartilhada/sub/b.txt'])
+        self.assertEqual(listing['entries'][1]['size'], 2)
+
+    def test_list_pages(self):
+        """
+        Testa a paginação da listagem.
+        """
+        for i in range(5):
+            self.write(f'f{i}.txt', b'x')
+        catalogo = Catalogo()
+        catalogo.share(self.root)
+        catalogo.wait_for_scan()
+        pages = [catalogo.list(page, 3)['entries'] for page in range(3)]
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        self.assertEqual(len({e['path'] for p in pages for e in p}), 7)
+
+    def test_incremental_scan(self):
+        """
+        Testa que a varredura detecta apenas os arquivos novos, alterados ou removidos.
+        """
+        catalogo = Catalogo()
+        catalogo.share(self.root)
+        catalogo.wait_for_scan()
+        self.assertEqual(catalogo.scan(), 0)
+
+        self.write('a.txt', b'aaa')
+        self.write('c.txt', b'c')
+        os.remove(os.path.join(self.root, 'sub', 'b.txt'))
+        self.assertEqual(catalogo.scan(), 3)
+        self.assertEqual(catalogo.scan(), 0)
+
+    def test_list_served_from_cache(self):
+        """
+        Testa que listagens repetidas não varrem o disco, e que o cache é invalidado por alterações.
+        """
+        catalogo = Catalogo(scan_interval=60)
+        catalogo.share(self.root)
+        catalogo.wait_for_scan()
+        catalogo.list()
+        version = catalogo.version
+        with patch('arquivos_em_rede_local.catalogo.os.scandir') as scandir:
+            catalogo.list()
+            catalogo.list(0, 1)
+            scandir.assert_not_called()
+
+        self.write('c.txt', b'c')
+        catalogo.scan()
+        self.assertGreater(catalogo.version, version)
+        self.assertEqual(catalogo.list()['total'], 3)
+
+    def test_list_does_not_wait_for_scan(self):
+        """
+        Testa que, durante uma varredura em segundo plano, a listagem é servida da varredura anterior.
+        """
+        catalogo = Catalogo(scan_interval=0)
+        catalogo.share(self.root)
+        catalogo.wait_for_scan()
+        self.write('c.txt', b'c')
+        liberar = threading.Event()
+        varredura = catalogo._scan_folder
+        def lenta(*args):
+            liberar.wait()
+            varredura(*args)
+        with patch.object(catalogo, '_scan_folder', side_effect=lenta):
+            self.assertEqual(catalogo.list()['total'], 2)
+            self.assertFalse(catalogo.wait_for_scan(0.05))
+            self.assertEqual(catalogo.list()['total'], 2)
+            liberar.set()
+            self.assertTrue(catalogo.wait_for_scan(5))
+        self.assertEqual(catalogo.list()['total'], 3)
+
+    def test_resolve(self):
+        """
+        Testa a conversão de caminhos do catálogo em caminhos locais.
+        """
+        catalogo = Catalogo()
+        catalogo.share(self.root)
+        catalogo.wait_for_scan()
+        self.assertEqual(catalogo.resolve('compartilhada/sub/b.txt'), os.path.join(self.root, 'sub', 'b.txt'))
+        self.assertIsNone(catalogo.resolve('compartilhada/../segredo.txt'))
+        self.assertIsNone(catalogo.resolve('outra/a.txt'))
+
+    def test_symlinks_are_not_shared(self):
+        """
+        Testa que links simbólicos não são publicados nem resolvidos, mesmo se criados após a varredura.
+        """
+        segredo = os.path.join(self.dir.name, 'segredo.txt')
+        with open(segredo, 'wb') as f:
+            f.write(b'segredo')
+        try:
+            os.symlink(segredo, os.path.join(self.root, 'atalho.txt'))
+        except (OSError, NotImplementedError):
+            self.skipTest("Links simbólicos não suportados")
+        catalogo = Catalogo()
+        catalogo.share(self.root)
+        catalogo.wait_for_scan()
+        self.assertNotIn('compartilhada/atalho.txt', [e['path'] for e in catalogo.list()['entries']])
+        self.assertIsNone(catalogo.resolve('compartilhada/atalho.txt'))
+
+        os.remove(os.path.join(self.root, 'a.txt'))
+        os.symlink(segredo, os.path.join(self.root, 'a.txt'))
+        self.assertIsNone(catalogo.resolve('compartilhada/a.txt'))
+
+    def test_unshare(self):
+        """
+        Testa a remoção de uma pasta do catálogo.
+        """
+        catalogo = Catalogo()
+        catalogo.share(self.root)
+        catalogo.wait_for_scan()
+        catalogo.unshare('compartilhada')
+        self.assertEqual(catalogo.list()['total'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ from time import sleep
 import unittest
 import socket
 import threading
+from unittest.mock import MagicMock
 
 from arquivos_em_rede_local.descoberta import Descoberta
 
@@ -236,5 +237,17 @@ class TestDescoberta(unittest.TestCase):
         ip = d.get_local_ip()
         self.assertTrue(ip.startswith('192.168.'))
 
+    def test_local_ip_is_lazy(self):
+        """
+        Testa que o endereço IP local só é obtido no primeiro acesso.
+        """
+        transporte = MagicMock()
+        transporte.get_local_ip.return_value = '10.0.0.1'
+        d = Descoberta("Test", transporte=transporte)
+        transporte.get_local_ip.assert_not_called()
+        self.assertEqual(d.local_ip, '10.0.0.1')
+        self.assertEqual(d.local_ip, '10.0.0.1')
+        transporte.get_local_ip.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,122 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+import urllib.request
+
+from arquivos_em_rede_local.metricas import RegistroMetricas, ServidorMetricas, Histograma
+from arquivos_em_rede_local.rede_simulada import RedeSimulada
+from tests.simulacao import IP_RECEPTOR, transfer_pair, write_file
+
+class TestMetricas(unittest.TestCase):
+    def test_counter_across_threads(self):
+        """
+        Testa que incrementos feitos por várias threads são todos somados.
+        """
+        registro = RegistroMetricas()
+        contador = registro.counter('eventos_total', 'Eventos')
+        def incrementa():
+            for _ in range(10000):
+                contador.inc()
+        threads = [threading.Thread(target=incrementa) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(contador.value, 80000)
+        self.assertIs(registro.counter('eventos_total', 'Eventos'), contador)
+
+    def test_finished_threads_are_merged(self):
+        """
+        Testa que os fragmentos de threads encerradas são incorporados ao total, sem se acumular.
+        """
+        contador = RegistroMetricas().counter('eventos_total', 'Eventos')
+        for _ in range(500):
+            t = threading.Thread(target=contador.inc, args=(2,))
+            t.start()
+            t.join()
+        self.assertEqual(contador.value, 1000)
+        self.assertLessEqual(len(contador._fragmentos), 1)
+
+    def test_histogram_buckets(self):
+        """
+        Testa a contagem acumulada dos buckets de um histograma.
+        """
+        histograma = Histograma(buckets=(1, 10))
+        for valor in (0.5, 1, 5, 50):
+            histograma.observe(valor)
+        valor = histograma.value
+        self.assertEqual(valor['count'], 4)
+        self.assertEqual(valor['sum'], 56.5)
+        self.assertEqual(list(valor['buckets'].values()), [2, 3, 4])
+
+    def test_render_prometheus(self):
+        """
+        Testa o formato de texto do Prometheus, com rótulos e histogramas.
+        """
+        registro = RegistroMetricas()
+        registro.counter('erros_total', 'Erros', labels={'op': 'send'}).inc(2)
+        registro.histogram('duracao_seconds', 'Duração', buckets=(1,)).observe(0.5)
+        registro.gauge('dispositivos', 'Dispositivos', funcao=lambda: 3)
+        texto = registro.render_prometheus()
+        self.assertIn('# TYPE erros_total counter\nerros_total{op="send"} 2\n', texto)
+        self.assertIn('duracao_seconds_bucket{le="1.0"} 1\n', texto)
+        self.assertIn('duracao_seconds_bucket{le="+Inf"} 1\n', texto)
+        self.assertIn('duracao_seconds_count 1\n', texto)
+        self.assertIn('dispositivos 3\n', texto)
+        self.assertEqual(registro.snapshot()['erros_total{op=send}'], 2)
+
+    def test_server(self):
+        """
+        Testa os endpoints /metrics e /stats do servidor de métricas.
+        """
+        registro = RegistroMetricas()
+        registro.counter('eventos_total', 'Eventos').inc()
+        servidor = ServidorMetricas(registro, port=0)
+        try:
+            url = f'http://127.0.0.1:{servidor.port}'
+            with urllib.request.urlopen(url + '/metrics') as resposta:
+                self.assertIn('eventos_total 1', resposta.read().decode())
+            with urllib.request.urlopen(url + '/stats') as resposta:
+                self.assertEqual(json.load(resposta), {'eventos_total': 1})
+        finally:
+            servidor.close()
+
+    def test_transfer_metrics(self):
+        """
+        Testa as métricas registradas pelo envio e pelo recebimento de um arquivo.
+        """
+        registro_emissor, registro_receptor = RegistroMetricas(), RegistroMetricas()
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_file(tmp, 'arquivo.bin', os.urandom(100000))
+            with transfer_pair(tmp, receptor={'metricas': registro_receptor},
+                               emissor={'metricas': registro_emissor}) as (_, emissor):
+                self.assertEqual(emissor.send(source, IP_RECEPTOR), "File sent successfully")
+
+        enviados = registro_emissor.snapshot()
+        self.assertEqual(enviados['arquivos_transfer_bytes_sent_total'], 100000)
+        self.assertEqual(enviados['arquivos_transfers_total{result=sent}'], 1)
+        for fase in ('connect', 'authorization', 'data', 'finish'):
+            self.assertEqual(enviados[f'arquivos_transfer_phase_seconds{{phase={fase}}}']['count'], 1)
+        recebidos = registro_receptor.snapshot()
+        self.assertEqual(recebidos['arquivos_transfer_bytes_received_total'], 100000)
+        self.assertEqual(recebidos['arquivos_transfers_total{result=received}'], 1)
+
+    def test_finish_phase_waits_for_receiver(self):
+        """
+        Testa que a fase finish do TCP dura até o receptor fechar a conexão, ou seja, ao menos um RTT.
+        """
+        registro = RegistroMetricas()
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_file(tmp, 'arquivo.bin', b'conteudo')
+            rede = RedeSimulada(latency=0.05)
+            with transfer_pair(tmp, rede, emissor={'metricas': registro}) as (receptor, emissor):
+                self.assertEqual(emissor.send(source, IP_RECEPTOR), "File sent successfully")
+                # O envio só retorna depois que o receptor gravou o arquivo e fechou a conexão
+                self.assertEqual(os.listdir(receptor.download_dir), ['arquivo.bin'])
+
+        self.assertGreaterEqual(registro.snapshot()['arquivos_transfer_phase_seconds{phase=finish}']['sum'], 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
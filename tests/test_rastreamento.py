@@ -0,0 +1,137 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest.mock import patch
+
+from arquivos_em_rede_local.rastreamento import Rastreador, from_environment
+from tests.simulacao import IP_RECEPTOR, transfer_pair, write_file
+
+class TestRastreamento(unittest.TestCase):
+    def test_disabled(self):
+        """
+        Testa que o rastreador desativado não registra spans nem cria objetos.
+        """
+        rastreador = Rastreador()
+        span = rastreador.span('read')
+        self.assertIs(span, rastreador.span('send'))
+        with span:
+            span.set(bytes=1)
+        self.assertEqual(len(rastreador), 0)
+
+    def test_nested_spans(self):
+        """
+        Testa o registro de spans aninhados, de seus argumentos e de exceções.
+        """
+        rastreador = Rastreador(enabled=True)
+        with rastreador.span('send_file', 'transferencia', device='10.0.0.2'):
+            with rastreador.span('read', 'transferencia') as span:
+                span.set(bytes=10)
+        with self.assertRaises(ValueError):
+            with rastreador.span('write', 'transferencia'):
+                raise ValueError
+        eventos = [e for e in rastreador.events() if e['ph'] == 'X']
+        self.assertEqual([e['name'] for e in eventos], ['read', 'send_file', 'write'])
+        leitura, envio, escrita = eventos
+        self.assertEqual(leitura['args'], {'bytes': 10})
+        self.assertEqual(envio['args'], {'device': '10.0.0.2'})
+        self.assertEqual(escrita['args'], {'error': 'ValueError'})
+        self.assertLessEqual(envio['ts'], leitura['ts'])
+        self.assertGreaterEqual(envio['ts'] + envio['dur'], leitura['ts'] + leitura['dur'])
+
+    def test_ring_buffer(self):
+        """
+        Testa que apenas os spans mais recentes são mantidos.
+        """
+        rastreador = Rastreador(enabled=True, capacity=3)
+        for i in range(5):
+            with rastreador.span(f's{i}'):
+                pass
+        self.assertEqual([e['name'] for e in rastreador.events() if e['ph'] == 'X'], ['s2', 's3', 's4'])
+
+    def test_thread_names_follow_buffer(self):
+        """
+        Testa que apenas as threads com spans no buffer aparecem nos metadados.
+        """
+        rastreador = Rastreador(enabled=True, capacity=2)
+        def registra():
+            with rastreador.span('liveness'):
+                pass
+        for i in range(50):
+            t = threading.Thread(target=registra, name=f't{i}')
+            t.start()
+            t.join()
+        nomes = [e['args']['name'] for e in rastreador.events() if e['ph'] == 'M']
+        # Threads encerradas podem ter o identificador reaproveitado, então t48 e t49 podem aparecer como uma só
+        self.assertIn('t49', nomes)
+        self.assertLessEqual(set(nomes), {'t48', 't49'})
+
+    def test_sampling(self):
+        """
+        Testa que a amostragem é decidida no span mais externo e vale para os spans internos.
+        """
+        rastreador = Rastreador(enabled=True, sample_rate=0.5, seed=1)
+        for _ in range(200):
+            with rastreador.span('send_file'):
+                with rastreador.span('read'):
+                    pass
+        nomes = [e['name'] for e in rastreador.events() if e['ph'] == 'X']
+        self.assertTrue(50 < nomes.count('send_file') < 150)
+        self.assertEqual(nomes.count('read'), nomes.count('send_file'))
+
+    def test_hooks(self):
+        """
+        Testa que os hooks recebem cada span terminado.
+        """
+        rastreador = Rastreador(enabled=True)
+        eventos = []
+        rastreador.add_hook(eventos.append)
+        with rastreador.span('broadcast', 'descoberta'):
+            pass
+        self.assertEqual([(e['name'], e['cat']) for e in eventos], [('broadcast', 'descoberta')])
+
+    def test_from_environment(self):
+        """
+        Testa a configuração pelas variáveis de ambiente, incluindo uma amostragem inválida.
+        """
+        with patch.dict(os.environ, {'ARQUIVOS_EM_REDE_LOCAL_TRACE': 'trace.json',
+                                     'ARQUIVOS_EM_REDE_LOCAL_TRACE_SAMPLE': '0.25'}):
+            rastreador, caminho = from_environment()
+        self.assertTrue(rastreador.enabled)
+        self.assertEqual((rastreador.sample_rate, caminho), (0.25, 'trace.json'))
+
+        saida = StringIO()
+        variaveis = {'ARQUIVOS_EM_REDE_LOCAL_TRACE': '', 'ARQUIVOS_EM_REDE_LOCAL_TRACE_SAMPLE': '10%'}
+        with patch.dict(os.environ, variaveis), redirect_stdout(saida):
+            rastreador, caminho = from_environment()
+        self.assertEqual((rastreador.enabled, rastreador.sample_rate, caminho), (False, 1.0, None))
+        self.assertIn('ARQUIVOS_EM_REDE_LOCAL_TRACE_SAMPLE', saida.getvalue())
+
+    def test_transfer_trace(self):
+        """
+        Testa os spans de uma transferência e o arquivo no formato Trace Event.
+        """
+        rastreador = Rastreador(enabled=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            source = write_file(tmp, 'arquivo.bin', os.urandom(100000))
+            with transfer_pair(tmp, receptor={'rastreador': rastreador},
+                               emissor={'rastreador': rastreador}) as (_, emissor):
+                self.assertEqual(emissor.send(source, IP_RECEPTOR), "File sent successfully")
+
+            trace = os.path.join(tmp, 'trace.json')
+            self.assertGreater(rastreador.dump(trace), 0)
+            with open(trace) as f:
+                eventos = json.load(f)['traceEvents']
+
+        spans = [e for e in eventos if e['ph'] == 'X']
+        nomes = {e['name'] for e in spans}
+        for nome in ('send_file', 'receive_file', 'authorization', 'read', 'send', 'recv', 'write'):
+            self.assertIn(nome, nomes)
+        self.assertEqual(sum(e['args'].get('bytes', 0) for e in spans if e['name'] == 'write'), 100000)
+        self.assertTrue(any(e['ph'] == 'M' and e['name'] == 'thread_name' for e in eventos))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import os
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+from arquivos_em_rede_local.descoberta import Descoberta
+from arquivos_em_rede_local.rede_simulada import RedeSimulada
+from arquivos_em_rede_local.transferencia import Transferencia
+from tests.simulacao import stop_listeners
+
+NUM_PEERS = 500
+
+def peer_ip(i):
+    return f'10.0.{i // 250}.{i % 250 + 1}'
+
+class TestRedeSimulada(unittest.TestCase):
+    def test_tcp_connection(self):
+        """
+        Testa conexões TCP simuladas entre dois transportes.
+        """
+        rede = RedeSimulada()
+        a, b = rede.transport('10.0.0.1'), rede.transport('10.0.0.2')
+        with self.assertRaises(ConnectionRefusedError):
+            a.create_connection(('10.0.0.2', 80))
+
+        server = b.create_server(('', 80))
+        client = a.create_connection(('10.0.0.2', 80))
+        conn, addr = server.accept()
+        self.assertEqual(addr[0], '10.0.0.1')
+
+        client.sendall(b'hello')
+        self.assertEqual(conn.recv(1024), b'hello')
+        conn.settimeout(0.01)
+        with self.assertRaises(socket.timeout):
+            conn.recv(1024)
+        client.close()
+        conn.settimeout(None)
+        self.assertEqual(conn.recv(1024), b'')
+        conn.close()
+        server.close()
+
+    def test_udp_broadcast(self):
+        """
+        Testa o envio de datagramas em broadcast para todos os sockets da porta.
+        """
+        rede = RedeSimulada()
+        receivers = []
+        for i in range(3):
+            sock = rede.transport(peer_ip(i)).udp_socket()
+            sock.bind(('', 9000))
+            sock.settimeout(1)
+            receivers.append(sock)
+
+        sender = rede.transport('10.0.9.9').udp_socket()
+        sender.sendto(b'ping', ('<broadcast>', 9000))
+        for sock in receivers:
+            data, addr = sock.recvfrom(1024)
+            self.assertEqual((data, addr[0]), (b'ping', '10.0.9.9'))
+            sock.close()
+
+    def test_latency_and_bandwidth(self):
+        """
+        Testa o atraso e a banda do enlace simulado.
+        """
+        rede = RedeSimulada(latency=0.05, bandwidth=100000)
+        server = rede.transport('10.0.0.2').create_server(('', 80))
+        client = rede.transport('10.0.0.1').create_connection(('10.0.0.2', 80))
+        conn, _ = server.accept()
+
+        inicio = monotonic()
+        client.sendall(b'x' * 10000)
+        received = 0
+        while received < 10000:
+            received += len(conn.recv(65536))
+        self.assertGreaterEqual(monotonic() - inicio, 0.05 + 10000 / 100000)
+
+    def test_loss_is_deterministic(self):
+        """
+        Testa que as perdas dependem apenas da semente e da sequência de envios.
+        """
+        def received_datagrams(seed):
+            rede = RedeSimulada(loss=0.5, seed=seed)
+            receiver = rede.transport('10.0.0.2').udp_socket()
+            receiver.bind(('', 9000))
+            receiver.setblocking(False)
+            sender = rede.transport('10.0.0.1').udp_socket()
+            for i in range(100):
+                sender.sendto(bytes([i]), ('10.0.0.2', 9000))
+            received = []
+            while True:
+                try:
+                    received.append(receiver.recvfrom(1)[0][0])
+                except BlockingIOError:
+                    return received
+
+        first = received_datagrams(1)
+        self.assertTrue(0 < len(first) < 100)
+        self.assertEqual(first, received_datagrams(1))
+        self.assertNotEqual(first, received_datagrams(2))
+
+    def test_discovery_converges_with_many_peers(self):
+        """
+        Testa que um dispositivo que entra em uma rede com NUM_PEERS dispositivos descobre todos eles e é descoberto por todos.
+        """
+        rede = RedeSimulada(latency=0.001)
+        peers = [Descoberta(f'peer{i}', transporte=rede.transport(peer_ip(i)), response_window=0.5)
+                 for i in range(NUM_PEERS)]
+        for peer in peers:
+            peer.discovery_listener_thread.start()
+
+        novo = Descoberta('novo', transporte=rede.transport('10.1.0.1'), response_window=0.5)
+        # Garante que todos os listeners já estão associados à porta de descoberta
+        while len(rede._udp_por_porta.get(novo.discovery_port, ())) < NUM_PEERS:
+            threading.Event().wait(0.01)
+        novo.start_discovery_process()
+        novo.listen_for_responses_thread.join()
+
+        # Compara listas, e não conjuntos, para que um dispositivo duplicado seja detectado
+        ips = sorted(d['ip'] for d in novo.get_connected_devices())
+        self.assertEqual(ips, sorted(peer_ip(i) for i in range(NUM_PEERS)))
+        for peer in peers:
+            peer.comunication_thread.join()
+            self.assertEqual([d['name'] for d in peer.get_connected_devices()], ['novo'])
+
+        for peer in peers + [novo]:
+            peer.running_discovery = False
+        for peer in peers + [novo]:
+            peer.discovery_listener_thread.join()
+
+    def test_transfer_to_many_peers(self):
+        """
+        Testa o envio concorrente de um arquivo para NUM_PEERS dispositivos simulados.
+        """
+        rede = RedeSimulada(latency=0.001, bandwidth=10 * 1024 * 1024)
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'arquivo.bin')
+            content = os.urandom(16 * 1024)
+            with open(source, 'wb') as f:
+                f.write(content)
+
+            receivers = []
+            for i in range(NUM_PEERS):
+                download_dir = os.path.join(tmp, str(i))
+                os.mkdir(download_dir)
+                receivers.append(Transferencia(lambda ip, name: True, transporte=rede.transport(peer_ip(i)),
+                                               download_dir=download_dir))
+            sender = Transferencia(lambda ip, name: False, transporte=rede.transport('10.1.0.1'))
+
+            with ThreadPoolExecutor(max_workers=NUM_PEERS) as pool:
+                results = list(pool.map(lambda i: sender.send(source, peer_ip(i)), range(NUM_PEERS)))
+
+            self.assertEqual(results, ["File sent successfully"] * NUM_PEERS)
+            stop_listeners(*receivers, sender)
+            for i in range(NUM_PEERS):
+                with open(os.path.join(tmp, str(i), 'arquivo.bin'), 'rb') as f:
+                    self.assertEqual(f.read(), content)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,16 @@
 import unittest
 from unittest.mock import patch, mock_open, MagicMock
 from arquivos_em_rede_local.transferencia import Transferencia
+from arquivos_em_rede_local.catalogo import Catalogo
+from arquivos_em_rede_local.rede_simulada import RedeSimulada
 import socket
 import threading
 from time import sleep
 import os
+import hashlib
+import tempfile
+
+from tests.simulacao import IP_RECEPTOR, transfer_pair, write_file
 
 class TestTransferencia(unittest.TestCase):
     @patch('arquivos_em_rede_local.transferencia.open', new_callable=mock_open, read_data=b'test data')
@@ -71,5 +77,169 @@ class TestTransferencia(unittest.TestCase):
             t.listen_to_incoming_requests_thread.join()
         os.remove(file_name)
 
+    def test_receive_and_save_file_in_chunks(self):
+        """
+        Testa o recebimento em blocos, com o marcador de fim dividido entre dois recv.
+        """
+        file_name = 'test_file_chunks.bin'
+        file_content = os.urandom(300 * 1024)
+
+        t = Transferencia(lambda ip, name: True, transfer_port=23011)
+        receiver, sender = socket.socketpair()
+
+        def send_data():
+            sender.sendall(file_content + b'End of')
+            sleep(.1)
+            sender.sendall(b' file')
+
+        threading.Thread(target=send_data, daemon=True).start()
+        t._receive_and_save_file(receiver, file_name)
+
+        with open(file_name, 'rb') as f:
+            received_content = f.read()
+        self.assertEqual(received_content, file_content)
+        self.assertEqual(t.indice.lookup(hashlib.sha256(file_content).hexdigest()), os.path.abspath(file_name))
+
+        receiver.close()
+        sender.close()
+        t.running_listener = False
+        t.listen_to_incoming_requests_thread.join()
+        os.remove(file_name)
+
+    def test_send_file_already_present(self):
+        """
+        Testa que um arquivo com conteúdo já presente no destino não é transferido de novo.
+        """
+        transfer_port = 23013
+        file_name = 'test_file_present.txt'
+        file_content = b'This is a test file.'
+        os.makedirs('test_present_dir', exist_ok=True)
+        source = os.path.join('test_present_dir', file_name)
+        with open(source, 'wb') as f:
+            f.write(file_content)
+
+        # Uma cópia recebida anteriormente; o arquivo enviado não entra no índice
+        previous = os.path.join('test_present_dir', 'received_before.txt')
+        with open(previous, 'wb') as f:
+            f.write(file_content)
+
+        t = Transferencia(lambda ip, name: True, transfer_port=transfer_port)
+        t.indice.add(previous, hashlib.sha256(file_content).hexdigest())
+        sleep(1)  # Give some time for the listener to start
+        with patch.object(t, '_receive_and_save_file') as receive:
+            result = t.send(source, '127.0.0.1')
+            receive.assert_not_called()
+
+        self.assertEqual(result, "File already present on device")
+        with open(file_name, 'rb') as f:
+            self.assertEqual(f.read(), file_content)
+
+        t.running_listener = False
+        t.listen_to_incoming_requests_thread.join()
+        os.remove(file_name)
+        os.remove(source)
+        os.remove(previous)
+        os.rmdir('test_present_dir')
+
+    def test_overwrite_after_have(self):
+        """
+        Testa que sobrescrever um arquivo recebido não altera outro criado a partir do mesmo conteúdo.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            with transfer_pair(tmp) as (receptor, emissor):
+                def envia(nome, conteudo):
+                    return emissor.send(write_file(tmp, nome, conteudo), IP_RECEPTOR)
+
+                self.assertEqual(envia('relatorio.txt', b'versao 1'), "File sent successfully")
+                self.assertEqual(envia('copia.txt', b'versao 1'), "File already present on device")
+                self.assertEqual(envia('relatorio.txt', b'versao 2'), "File sent successfully")
+            download_dir = receptor.download_dir
+            with open(os.path.join(download_dir, 'copia.txt'), 'rb') as f:
+                self.assertEqual(f.read(), b'versao 1')
+            with open(os.path.join(download_dir, 'relatorio.txt'), 'rb') as f:
+                self.assertEqual(f.read(), b'versao 2')
+            self.assertEqual(sorted(os.listdir(download_dir)), ['copia.txt', 'relatorio.txt'])
+
+    def test_browse_and_pull(self):
+        """
+        Testa a listagem do catálogo remoto e o download de arquivos e intervalos de bytes.
+        """
+        transfer_port = 23014
+        file_name = 'test_file_shared.bin'
+        file_content = os.urandom(100 * 1024)
+        os.makedirs('test_shared_dir', exist_ok=True)
+        with open(os.path.join('test_shared_dir', file_name), 'wb') as f:
+            f.write(file_content)
+
+        catalogo = Catalogo()
+        catalogo.share('test_shared_dir')
+        catalogo.wait_for_scan()
+        t = Transferencia(lambda ip, name: False, transfer_port=transfer_port, catalogo=catalogo)
+        sleep(1)  # Give some time for the listener to start
+
+        listing = t.browse('127.0.0.1')
+        self.assertEqual([e['path'] for e in listing['entries']], ['test_shared_dir/' + file_name])
+
+        result = t.pull('127.0.0.1', 'test_shared_dir/' + file_name)
+        self.assertEqual(result, "File received successfully")
+        with open(file_name, 'rb') as f:
+            self.assertEqual(f.read(), file_content)
+
+        result = t.pull('127.0.0.1', 'test_shared_dir/' + file_name, offset=1000, length=10)
+        self.assertEqual(result, "File received successfully")
+        with open(file_name, 'rb') as f:
+            self.assertEqual(f.read(), file_content)
+
+        result = t.pull('127.0.0.1', 'test_shared_dir/missing.bin')
+        self.assertEqual(result, "Failed to receive file: File not shared")
+
+        t.running_listener = False
+        t.listen_to_incoming_requests_thread.join()
+        os.remove(file_name)
+        os.remove(os.path.join('test_shared_dir', file_name))
+        os.rmdir('test_shared_dir')
+
+    def test_pull_ranges_out_of_order(self):
+        """
+        Testa que baixar um intervalo anterior não trunca o que já foi baixado de um intervalo posterior.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            shared = os.path.join(tmp, 'compartilhada')
+            download_dir = os.path.join(tmp, 'baixados')
+            os.mkdir(shared)
+            os.mkdir(download_dir)
+            content = os.urandom(10000)
+            write_file(shared, 'arquivo.bin', content)
+            catalogo = Catalogo()
+            catalogo.share(shared)
+            catalogo.wait_for_scan()
+            # O receptor do par faz o papel de servidor do catálogo, e o emissor, de cliente
+            with transfer_pair(tmp, receptor={'get_user_authorization': lambda ip, name: False, 'catalogo': catalogo},
+                               emissor={'download_dir': download_dir}) as (_, cliente):
+                for offset in (5000, 0):
+                    result = cliente.pull(IP_RECEPTOR, 'compartilhada/arquivo.bin', offset=offset, length=5000)
+                    self.assertEqual(result, "File received successfully")
+            with open(os.path.join(download_dir, 'arquivo.bin'), 'rb') as f:
+                self.assertEqual(f.read(), content)
+
+    def test_lazy_listener(self):
+        """
+        Testa que, com listen=False, o listener só é iniciado por start_listener().
+        """
+        rede = RedeSimulada()
+        t = Transferencia(lambda ip, name: False, transporte=rede.transport('10.0.0.2'), listen=False)
+        cliente = rede.transport('10.0.0.1')
+        with self.assertRaises(ConnectionRefusedError):
+            cliente.create_connection(('10.0.0.2', t.transfer_port))
+
+        t.start_listener()
+        t.start_listener()
+        while not t.listen_to_incoming_requests_thread.is_alive() or ('10.0.0.2', t.transfer_port) not in rede._servidores:
+            sleep(0.01)
+        cliente.create_connection(('10.0.0.2', t.transfer_port)).close()
+
+        t.running_listener = False
+        t.listen_to_incoming_requests_thread.join()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,210 @@
+import unittest
+import hashlib
+import io
+import os
+import random
+import socket
+import tempfile
+import threading
+from time import sleep
+from unittest.mock import patch
+
+from arquivos_em_rede_local.transferencia import Transferencia, MODO_UDP
+from arquivos_em_rede_local.transferencia_udp import (
+    ControleCongestionamento,
+    EmissorUDP,
+    ReceptorUDP,
+    LIMIAR_PERDA,
+    TAMANHO_MAX_UDP,
+)
+
+class SocketComPerda:
+    """
+    Envolve um socket UDP descartando uma fração dos datagramas enviados.
+    """
+
+    def __init__(self, sock, perda, semente=0):
+        self.sock = sock
+        self.perda = perda
+        self.random = random.Random(semente)
+
+    def sendto(self, data, addr):
+        if self.random.random() < self.perda:
+            return len(data)
+        return self.sock.sendto(data, addr)
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+class TestTransferenciaUDP(unittest.TestCase):
+    def transfer(self, content, perda_dados=0.0, perda_acks=0.0):
+        """
+        Transfere um conteúdo entre um EmissorUDP e um ReceptorUDP no loopback.
+        """
+        sender_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver_sock.bind(('127.0.0.1', 0))
+        control_receiver, control_sender = socket.socketpair()
+        output = io.BytesIO()
+
+        receptor = ReceptorUDP(SocketComPerda(receiver_sock, perda_acks, 1), output, len(content))
+        result = []
+        t = threading.Thread(target=lambda: result.append(receptor.run(control_receiver)), daemon=True)
+        t.start()
+
+        emissor = EmissorUDP(SocketComPerda(sender_sock, perda_dados, 2), receiver_sock.getsockname(),
+                             io.BytesIO(content), len(content))
+        file_hash = emissor.run()
+        control_sender.sendall(b'DONE')
+        t.join()
+
+        for s in (sender_sock, receiver_sock, control_receiver, control_sender):
+            s.close()
+        return output.getvalue(), file_hash, emissor, receptor
+
+    def test_transfer_without_loss(self):
+        """
+        Testa a transferência por UDP sem perdas.
+        """
+        content = os.urandom(500 * 1024)
+        received, file_hash, emissor, receptor = self.transfer(content)
+        self.assertTrue(receptor.complete)
+        self.assertEqual(received, content)
+        self.assertEqual(file_hash, hashlib.sha256(content).hexdigest())
+
+    def test_transfer_with_loss(self):
+        """
+        Testa que pacotes e confirmações perdidos são retransmitidos.
+        """
+        content = os.urandom(500 * 1024)
+        received, file_hash, emissor, receptor = self.transfer(content, perda_dados=0.05, perda_acks=0.05)
+        self.assertTrue(receptor.complete)
+        self.assertEqual(received, content)
+        self.assertEqual(file_hash, hashlib.sha256(content).hexdigest())
+        self.assertGreater(emissor.retransmitidos, 0)
+
+    def test_transfer_empty_file(self):
+        """
+        Testa a transferência de um arquivo vazio.
+        """
+        received, file_hash, emissor, receptor = self.transfer(b'')
+        self.assertEqual(received, b'')
+        self.assertEqual(file_hash, hashlib.sha256(b'').hexdigest())
+
+    def test_congestion_control_tolerates_random_loss(self):
+        """
+        Testa que perdas abaixo do limiar não reduzem a banda estimada, e perdas acima reduzem.
+        """
+        controle = ControleCongestionamento(taxa_inicial=1000, rtt_inicial=1.0)
+        controle.on_ack(0.0, 0)
+        controle.on_ack(1.0, 10000)
+        self.assertEqual(controle.banda, 10000)
+
+        controle.on_loss(1.5, 10000 * LIMIAR_PERDA / 2)
+        controle.on_ack(2.0, 10000)
+        self.assertEqual(controle.banda, 10000)
+
+        controle.on_loss(2.5, 10000)
+        controle.on_ack(3.0, 10000)
+        self.assertLess(controle.banda, 10000)
+        self.assertFalse(controle.em_partida)
+
+    def test_send_udp_mode(self):
+        """
+        Testa o envio de um arquivo no modo UDP entre duas instâncias de Transferencia.
+        """
+        transfer_port = 23012
+        file_name = 'test_udp_received.bin'
+        content = os.urandom(200 * 1024)
+        os.makedirs('test_udp_dir', exist_ok=True)
+        with open(os.path.join('test_udp_dir', file_name), 'wb') as f:
+            f.write(content)
+
+        t = Transferencia(lambda ip, name: name == file_name, transfer_port=transfer_port)
+        sleep(1)  # Give some time for the listener to start
+        # O emissor e o receptor compartilham o índice; evita que o receptor reaproveite a origem
+        with patch.object(t.indice, 'lookup', return_value=None):
+            result = t.send(os.path.join('test_udp_dir', file_name), '127.0.0.1', mode=MODO_UDP)
+
+        self.assertEqual(result, "File sent successfully")
+        with open(file_name, 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+        t.running_listener = False
+        t.listen_to_incoming_requests_thread.join()
+        os.remove(file_name)
+        os.remove(os.path.join('test_udp_dir', file_name))
+        os.rmdir('test_udp_dir')
+
+    def test_failed_udp_transfer_keeps_existing_file(self):
+        """
+        Testa que uma transferência UDP que falha na verificação de integridade não altera o arquivo existente.
+        """
+        transfer_port = 23017
+        with tempfile.TemporaryDirectory() as tmp:
+            download_dir = os.path.join(tmp, 'recebidos')
+            os.mkdir(download_dir)
+            with open(os.path.join(download_dir, 'arquivo.bin'), 'wb') as f:
+                f.write(b'copia boa')
+            source = os.path.join(tmp, 'arquivo.bin')
+            with open(source, 'wb') as f:
+                f.write(os.urandom(100 * 1024))
+
+            receptor = Transferencia(lambda ip, name: True, transfer_port=transfer_port, download_dir=download_dir)
+            emissor = Transferencia(lambda ip, name: False, transfer_port=transfer_port, listen=False)
+            sleep(1)  # Give some time for the listener to start
+            with patch('arquivos_em_rede_local.transferencia.sha256_file', return_value='0' * 64):
+                result = emissor.send(source, '127.0.0.1', mode=MODO_UDP)
+            receptor.running_listener = False
+            receptor.listen_to_incoming_requests_thread.join()
+
+            self.assertEqual(result, "Failed to send file: Integrity check failed")
+            self.assertEqual(os.listdir(download_dir), ['arquivo.bin'])
+            with open(os.path.join(download_dir, 'arquivo.bin'), 'rb') as f:
+                self.assertEqual(f.read(), b'copia boa')
+
+    def test_malformed_udp_requests(self):
+        """
+        Testa que solicitações UDP com tamanho ausente, inválido ou excessivo são recusadas sem encerrar o listener.
+        """
+        transfer_port = 23016
+        t = Transferencia(lambda ip, name: True, transfer_port=transfer_port)
+        sleep(1)  # Give some time for the listener to start
+        for request in (b'SEND x\nmode=udp', b'SEND x\nmode=udp\nsize=abc', b'SEND x\nmode=udp\nsize=-1',
+                        f'SEND x\nmode=udp\nsize={TAMANHO_MAX_UDP + 1}'.encode(), b'\xff\xfe'):
+            with socket.create_connection(('127.0.0.1', transfer_port), timeout=5) as sock:
+                sock.sendall(request)
+                response = sock.recv(1024)
+                if request.startswith(b'SEND'):
+                    self.assertEqual(response, b'NO')
+        self.assertTrue(t.listen_to_incoming_requests_thread.is_alive())
+
+        t.running_listener = False
+        t.listen_to_incoming_requests_thread.join()
+
+    def test_send_udp_without_port(self):
+        """
+        Testa o envio UDP quando o receptor autoriza sem informar a porta UDP.
+        """
+        server = socket.create_server(('127.0.0.1', 0))
+        def answer():
+            conn, _ = server.accept()
+            with conn:
+                conn.recv(1024)
+                conn.sendall(b'OK')
+                conn.recv(1024)
+        thread = threading.Thread(target=answer)
+        thread.start()
+
+        t = Transferencia(lambda ip, name: False, transfer_port=server.getsockname()[1], listen=False)
+        with open('test_udp_no_port.bin', 'wb') as f:
+            f.write(b'data')
+        result = t.send('test_udp_no_port.bin', '127.0.0.1', mode=MODO_UDP)
+        self.assertEqual(result, "Failed to send file: Receiver did not provide a UDP port")
+
+        thread.join()
+        server.close()
+        os.remove('test_udp_no_port.bin')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import os
+import tempfile
+from time import sleep
+
+from arquivos_em_rede_local.descoberta import Descoberta
+from arquivos_em_rede_local.transferencia import Transferencia
+from arquivos_em_rede_local.transporte import Transporte, TransporteSocket
+
+class TestTransporteSocket(unittest.TestCase):
+    def test_get_local_ip_with_bind_ip(self):
+        """
+        Testa que o IP local é o endereço de associação, quando informado.
+        """
+        self.assertEqual(TransporteSocket('127.0.0.2').get_local_ip(), '127.0.0.2')
+
+    def test_two_instances_on_same_host(self):
+        """
+        Testa duas instâncias de Transferencia na mesma porta, em endereços de loopback distintos.
+        """
+        transfer_port = 23015
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'arquivo.txt')
+            with open(source, 'wb') as f:
+                f.write(b'conteudo')
+            download_dir = os.path.join(tmp, 'recebidos')
+            os.mkdir(download_dir)
+
+            a = Transferencia(lambda ip, name: False, transfer_port=transfer_port,
+                              transporte=TransporteSocket('127.0.0.2'))
+            b = Transferencia(lambda ip, name: ip == '127.0.0.2', transfer_port=transfer_port,
+                              transporte=TransporteSocket('127.0.0.3'), download_dir=download_dir)
+            sleep(1)  # Give some time for the listeners to start
+
+            self.assertEqual(a.send(source, '127.0.0.3'), "File sent successfully")
+            self.assertEqual(b.send(source, '127.0.0.2'), "Failed to send file: Authorization denied")
+
+            for t in (a, b):
+                t.running_listener = False
+                t.listen_to_incoming_requests_thread.join()
+            with open(os.path.join(download_dir, 'arquivo.txt'), 'rb') as f:
+                self.assertEqual(f.read(), b'conteudo')
+
+    def test_discovery_on_same_host(self):
+        """
+        Testa duas instâncias de Descoberta nas mesmas portas, em endereços de loopback distintos.
+        """
+        a = Descoberta('a', discovery_port=14820, comunication_port=7746, transporte=TransporteSocket('127.0.0.2'),
+                       response_window=1)
+        b = Descoberta('b', discovery_port=14820, comunication_port=7746, transporte=TransporteSocket('127.0.0.3'),
+                       response_window=1)
+        a.discovery_listener_thread.start()
+        sleep(.1)
+        b.start_discovery_process()
+        b.listen_for_responses_thread.join()
+
+        self.assertEqual(b.get_connected_devices(), [{'ip': '127.0.0.2', 'name': 'a'}])
+        a.comunication_thread.join()
+        self.assertEqual(a.get_connected_devices(), [{'ip': '127.0.0.3', 'name': 'b'}])
+
+        for d in (a, b):
+            d.running_discovery = False
+            d.discovery_listener_thread.join()
+
+    def test_transporte_is_abstract(self):
+        """
+        Testa que Transporte não pode ser instanciado sem implementar os métodos abstratos.
+        """
+        with self.assertRaises(TypeError):
+            Transporte()
+
+if __name__ == '__main__':
+    unittest.main()
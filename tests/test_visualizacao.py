@@ -0,0 +1,53 @@
+import unittest
+import subprocess
+import sys
+import tkinter as tk
+from unittest.mock import patch
+from time import perf_counter
+
+class TestInterfaceGrafica(unittest.TestCase):
+    def test_import_defers_network(self):
+        """
+        Testa que importar a interface gráfica não importa os componentes de rede.
+        """
+        codigo = ("import sys, arquivos_em_rede_local.visualizacao\n"
+                  "print(','.join(m for m in ('arquivos_em_rede_local.descoberta', 'arquivos_em_rede_local.transferencia',"
+                  " 'arquivos_em_rede_local.metricas', 'http.server') if m in sys.modules))")
+        saida = subprocess.run([sys.executable, '-c', codigo], check=True, capture_output=True, text=True).stdout
+        self.assertEqual(saida.strip(), '')
+
+    def test_time_to_first_frame(self):
+        """
+        Testa que o tempo até o primeiro quadro é medido e que a rede só é iniciada depois dele.
+
+        A rede é substituída por um stub; a meta de 200 ms é verificada pelo caso startup do benchmark.
+        """
+        from arquivos_em_rede_local.visualizacao import InterfaceGrafica
+        primeiro_quadro = []
+
+        def start_network(app):
+            primeiro_quadro.append(app.time_to_first_frame)
+            app.rede_pronta.set()
+
+        inicio = perf_counter()
+        with patch.object(InterfaceGrafica, '_start_network', autospec=True, side_effect=start_network):
+            try:
+                app = InterfaceGrafica("Test", started_at=inicio)
+            except tk.TclError:
+                self.skipTest("Sem display disponível")
+            try:
+                self.assertIsNone(app.descoberta)
+                self.assertEqual(str(app.atualizar_btn['state']), tk.DISABLED)
+                self.assertEqual(primeiro_quadro, [])
+                limite = perf_counter() + 5
+                while app.time_to_first_frame is None and perf_counter() < limite:
+                    app.root.update()
+                self.assertIsNotNone(app.time_to_first_frame)
+                self.assertGreater(app.time_to_first_frame, 0)
+                self.assertTrue(app.rede_pronta.wait(5))
+                self.assertEqual(primeiro_quadro, [app.time_to_first_frame])
+            finally:
+                app.root.destroy()
+
+if __name__ == '__main__':
+    unittest.main()